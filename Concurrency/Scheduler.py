@@ -13,74 +13,565 @@ Implement a robust scheduler that:
 
 """
 import threading
-import queue
 import random
+import time
+import heapq
+import itertools
+from concurrent.futures import Future, wait
+import asyncio
+from multiprocessing import Pipe, Process, resource_tracker, shared_memory
+import os
+import pickle
+import traceback
 
 MAX_RETRIES = 3
+SHARED_MEMORY_THRESHOLD = 64 * 1024  # pickled results larger than this come back through shared memory
+TASK_REGISTRY = {}
+
+def register(func):
+    """Make a module-level function runnable by process workers, which receive it by name rather than pickled."""
+    TASK_REGISTRY[func.__name__] = func
+    return func
+
+class Backoff:
+    """Exponential backoff with full jitter: retry n waits uniform(0, min(cap, base * 2**(n-1))) seconds."""
+    def __init__(self, base=0.1, cap=5.0, jitter=True):
+        self.base = base
+        self.cap = cap
+        self.jitter = jitter
+
+    def delay(self, attempt):
+        delay = min(self.cap, self.base * 2 ** (attempt - 1))
+        return random.uniform(0, delay) if self.jitter else delay
 
 class Task:
-    def __init__(self, func, retries=0):
+    """A unit of work and the Future its caller holds. Lower priority values run first."""
+    sequence = itertools.count()  # FIFO tie-breaker within a priority
+
+    def __init__(self, func, retries=0, max_retries=MAX_RETRIES, backoff=None, priority=0, args=()):
         self.func = func
+        self.args = args
         self.retries = retries
+        self.max_retries = max_retries
+        self.backoff = backoff or Backoff()
+        self.priority = priority
+        self.future = Future()
+        self.error = None
 
-    def run(self):
+    def __lt__(self, other):
+        return (self.priority, self.order) < (other.priority, other.order)
+
+    def queued(self):
+        self.order = next(Task.sequence)
+        self.queued_at = time.perf_counter()
+        return self
+
+    def run(self, execute):
         try:
-            self.func()
-            return True
+            result = execute(self)
         except Exception as e:
-            print(f"Task failed: {e}")
+            self.error = e
             return False
+        self.future.set_result(result)
+        return True
+
+class Histogram:
+    """Log2-bucketed durations: bucket i counts values below 2**i microseconds (and at least half that)."""
+    BUCKETS = 40
+
+    def __init__(self):
+        self.buckets = [0] * self.BUCKETS
+        self.count = 0
+        self.total = 0.0
+
+    def record(self, seconds):
+        self.buckets[min(int(seconds * 1e6).bit_length(), self.BUCKETS - 1)] += 1
+        self.count += 1
+        self.total += seconds
+
+    def merge(self, other):
+        for i, n in enumerate(other.buckets):
+            self.buckets[i] += n
+        self.count += other.count
+        self.total += other.total
+        return self
+
+    def percentile(self, q):
+        """Upper bound, in seconds, of the bucket holding the q-th quantile."""
+        rank, seen = q * self.count, 0
+        for i, n in enumerate(self.buckets):
+            seen += n
+            if n and seen >= rank:
+                return (1 << i) / 1e6
+        return 0.0
+
+    def snapshot(self):
+        return {
+            "count": self.count,
+            "mean": self.total / self.count if self.count else 0.0,
+            "p50": self.percentile(0.5),
+            "p99": self.percentile(0.99),
+        }
+
+class WorkerMetrics:
+    """Counters and histograms written only by the owning worker thread, so recording needs no lock."""
+    COUNTERS = ("runs", "failures", "retries", "exhausted", "cancelled")
+
+    def __init__(self):
+        self.runs = 0
+        self.failures = 0  # failed attempts
+        self.retries = 0
+        self.exhausted = 0  # tasks that failed their last attempt
+        self.cancelled = 0
+        self.wait_time = Histogram()
+        self.run_time = Histogram()
 
 class Worker(threading.Thread):
-    def __init__(self, task_queue, worker_id):
+    """Runs tasks from its own priority heap, stealing the most urgent task of a random peer when it runs dry."""
+    def __init__(self, scheduler, worker_id):
         super().__init__()
-        self.task_queue = task_queue
+        self.scheduler = scheduler
         self.worker_id = worker_id
+        self.tasks = []
+        self.lock = threading.Lock()
+        self.metrics = WorkerMetrics()
         self.daemon = True
         self._stop_event = threading.Event()
 
+    def push(self, task):
+        with self.lock:
+            heapq.heappush(self.tasks, task.queued())
+
+    def pop(self):
+        with self.lock:
+            return heapq.heappop(self.tasks) if self.tasks else None
+
+    def top_priority(self):
+        with self.lock:
+            return self.tasks[0].priority if self.tasks else None
+
+    def next_task(self):
+        return self.scheduler.take_urgent(self) or self.pop() or self.scheduler.steal(self)
+
     def run(self):
+        log, metrics = self.scheduler.log, self.metrics
         while not self._stop_event.is_set():
-            try:
-                task = self.task_queue.get(timeout=1)
-                print(f"Worker-{self.worker_id} got a task")
-                success = task.run()
-                if not success and task.retries < MAX_RETRIES:
-                    task.retries += 1
-                    print(f"Retrying (attempt {task.retries})...")
-                    self.task_queue.put(task)
-                self.task_queue.task_done()
-                print(f"Task {str(task.func)} completed by worker {self.worker_id}")
-            except queue.Empty:
+            task = self.next_task()
+            if task is None:
+                self.scheduler.park(self)
                 continue
+            if task.retries == 0 and not task.future.set_running_or_notify_cancel():
+                metrics.cancelled += 1
+                self.scheduler.task_done()  # cancelled while queued
+                continue
+            started = time.perf_counter()
+            metrics.wait_time.record(started - task.queued_at)
+            if log:
+                log(f"Worker-{self.worker_id} got a task")
+            success = task.run(self.execute)
+            metrics.run_time.record(time.perf_counter() - started)
+            metrics.runs += 1
+            if not success:
+                metrics.failures += 1
+                if log:
+                    log(f"Task failed: {task.error}")
+            if not success and task.retries < task.max_retries:
+                task.retries += 1
+                metrics.retries += 1
+                delay = task.backoff.delay(task.retries)
+                if log:
+                    log(f"Retrying (attempt {task.retries}) in {delay:.2f}s...")
+                self.scheduler.delay_queue.put(task, delay)
+            else:
+                if not success:
+                    metrics.exhausted += 1
+                    task.future.set_exception(task.error)
+                self.scheduler.task_done()
+            if log:
+                log(f"Task {str(task.func)} completed by worker {self.worker_id}")
+
+    def execute(self, task):
+        return task.func(*task.args)
+
+    def stop(self):
+        self._stop_event.set()
+
+    def close(self):
+        pass
+
+class RemoteError(Exception):
+    """Picklable stand-in for an exception raised in a worker process that cannot itself cross the pipe."""
+    def __init__(self, type_name: str, description: str, formatted_traceback: str):
+        super().__init__(type_name, description, formatted_traceback)
+        self.type_name = type_name
+        self.description = description
+        self.formatted_traceback = formatted_traceback
+
+    def __str__(self):
+        return f"{self.description} raised in worker process\n{self.formatted_traceback}"
+
+def process_main(conn, threshold):
+    """Child process loop: run registered functions by name and send back the pickled result, or its shared memory block."""
+    while (message := conn.recv()) is not None:
+        name, args = message
+        try:
+            result = pickle.dumps(TASK_REGISTRY[name](*args), pickle.HIGHEST_PROTOCOL)
+        except Exception as e:
+            try:
+                pickle.loads(pickle.dumps(e))
+            except Exception:
+                e = RemoteError(type(e).__name__, repr(e), traceback.format_exc())
+            conn.send(("error", e))
+            continue
+        if len(result) > threshold:
+            block = shared_memory.SharedMemory(create=True, size=len(result))
+            block.buf[:len(result)] = result
+            conn.send(("shared", block.name, len(result)))
+            block.close()
+        else:
+            conn.send(("ok", result))
+
+class ProcessWorker(Worker):
+    """
+    A Worker whose tasks execute in a dedicated child process, so CPU-bound work escapes the GIL while queueing,
+    stealing, retries and futures stay on the thread side. The thread just blocks on the pipe while the child runs.
+    """
+    def __init__(self, scheduler, worker_id):
+        super().__init__(scheduler, worker_id)
+        self.spawn()
+
+    def spawn(self):
+        self.conn, child_conn = Pipe()
+        self.process = Process(target=process_main, args=(child_conn, SHARED_MEMORY_THRESHOLD), daemon=True)
+
+    def start(self):
+        resource_tracker.ensure_running()  # share one tracker, so blocks the child creates can be unlinked here
+        self.process.start()
+        super().start()
+
+    def restart(self):
+        """Replace a child process that crashed or dropped its pipe."""
+        self.conn.close()
+        self.process.kill()
+        self.process.join()
+        self.spawn()
+        self.process.start()
+
+    def execute(self, task):
+        try:
+            self.conn.send((task.func.__name__, task.args))
+            status, *payload = self.conn.recv()
+        except (EOFError, BrokenPipeError, ConnectionResetError) as e:
+            self.restart()
+            raise RuntimeError(f"Worker {self.worker_id} process died running {task.func.__name__}; restarted") from e
+        if status == "error":
+            raise payload[0]
+        if status == "shared":
+            name, size = payload
+            block = shared_memory.SharedMemory(name=name)
+            view = block.buf[:size]
+            try:
+                return pickle.loads(view)  # unpickle straight from the block, no intermediate copy
+            finally:
+                view.release()  # close() fails while a view of the mapping is still exported
+                block.close()
+                block.unlink()
+        return pickle.loads(payload[0])
+
+    def close(self):
+        try:
+            self.conn.send(None)
+        except (BrokenPipeError, ConnectionResetError):
+            self.process.kill()
+        self.process.join()
+
+class DelayQueue(threading.Thread):
+    """Single timer thread holding tasks in a heap by due time; each task goes back to the pool only once it is due."""
+    def __init__(self, scheduler):
+        super().__init__()
+        self.scheduler = scheduler
+        self.heap = []
+        self.sequence = 0  # tie-breaker so tasks themselves are never compared
+        self.condition = threading.Condition()
+        self.daemon = True
+        self._stop_event = threading.Event()
+
+    def put(self, task, delay):
+        with self.condition:
+            heapq.heappush(self.heap, (time.monotonic() + delay, self.sequence, task))
+            self.sequence += 1
+            if self.heap[0][2] is task:
+                self.condition.notify()
+
+    def run(self):
+        with self.condition:
+            while not self._stop_event.is_set():
+                if not self.heap:
+                    self.condition.wait()
+                    continue
+                due = self.heap[0][0] - time.monotonic()
+                if due > 0:
+                    self.condition.wait(due)
+                    continue
+                _, _, task = heapq.heappop(self.heap)
+                self.scheduler.dispatch(task)
 
     def stop(self):
         self._stop_event.set()
+        with self.condition:
+            self.condition.notify()
 
 class Scheduler:
-    def __init__(self, num_workers):
-        self.queues = [queue.Queue() for _ in range(num_workers)]
-        self.workers = [Worker(self.queues[i], i) for i in range(num_workers)]
+    """
+    Tasks are dealt round-robin onto per-worker priority heaps. With work_stealing, an idle worker takes work from a random
+    peer, so one slow task no longer holds up the tasks queued behind it. Workers with nothing to do park on a
+    condition variable until a task is pushed, instead of polling with timeouts.
+    """
+    def __init__(self, num_workers, work_stealing=True, processes=False, log=None):
+        """
+        processes=True runs each task in a per-worker child process; tasks must then be register()ed functions.
+        log is any callable taking a message (print, logging.Logger.info, ...); None, the default, skips logging entirely.
+        """
+        self.log = log
+        self.work_stealing = work_stealing
+        self.processes = processes
+        worker = ProcessWorker if processes else Worker
+        self.workers = [worker(self, i) for i in range(num_workers)]
         self.index = 0  # Round-robin index
         self.lock = threading.Lock()
+        self.work_available = threading.Condition()
+        self.parked = 0
+        self.unfinished = 0
+        self.all_done = threading.Condition()
+        self.delay_queue = DelayQueue(self)
 
-    def submit(self, func):
+    def submit(self, func, args=(), priority=0, max_retries=MAX_RETRIES, backoff=None) -> Future:
+        """
+        Queue func(*args) and return a Future for its result, or for the exception of its last attempt.
+        Lower priority values run first; a failure is retried up to max_retries times, each after a Backoff delay.
+        The Future can be cancelled until a worker starts the task.
+        """
+        if self.processes and TASK_REGISTRY.get(func.__name__) is not func:
+            raise ValueError(f"{func.__name__} must be register()ed to run on process workers.")
+        task = Task(func, max_retries=max_retries, backoff=backoff, priority=priority, args=args)
+        with self.all_done:
+            self.unfinished += 1
+        self.dispatch(task)
+        return task.future
+
+    def dispatch(self, task):
         with self.lock:
-            task = Task(func)
-            self.queues[self.index % len(self.queues)].put(task)
+            worker = self.workers[self.index % len(self.workers)]
             self.index += 1
+        self.push(worker, task)
+
+    def push(self, worker, task):
+        worker.push(task)
+        with self.work_available:
+            if self.parked:
+                self.work_available.notify(1 if self.work_stealing else self.parked)
+
+    def steal(self, thief):
+        if not self.work_stealing:
+            return None
+        for victim in random.sample(self.workers, len(self.workers)):
+            if victim is not thief:
+                task = victim.pop()
+                if task is not None:
+                    return task
+        return None
+
+    def take_urgent(self, worker):
+        """
+        With work stealing, priorities hold across the pool: a worker takes a peer's top task when it is strictly
+        more urgent than its own, instead of draining its own heap first. Equal priorities stay local.
+        """
+        if not self.work_stealing:
+            return None
+        victim, best = None, worker.top_priority()
+        for peer in self.workers:
+            if peer is not worker:
+                priority = peer.top_priority()
+                if priority is not None and (best is None or priority < best):
+                    victim, best = peer, priority
+        return victim.pop() if victim is not None else None
+
+    def has_work(self, worker):
+        if not self.work_stealing:
+            return bool(worker.tasks)
+        return any(w.tasks for w in self.workers)
+
+    def park(self, worker):
+        with self.work_available:
+            self.parked += 1
+            while not worker._stop_event.is_set() and not self.has_work(worker):
+                self.work_available.wait()
+            self.parked -= 1
+
+    def task_done(self):
+        with self.all_done:
+            self.unfinished -= 1
+            if not self.unfinished:
+                self.all_done.notify_all()
+
+    def metrics(self) -> dict:
+        """Point-in-time view of queue depths, task counters and wait/run time histograms, per worker and in total."""
+        workers, wait_time, run_time = [], Histogram(), Histogram()
+        totals = dict.fromkeys(WorkerMetrics.COUNTERS, 0)
+        for worker in self.workers:
+            metrics = worker.metrics
+            counters = {name: getattr(metrics, name) for name in WorkerMetrics.COUNTERS}
+            for name, value in counters.items():
+                totals[name] += value
+            wait_time.merge(metrics.wait_time)
+            run_time.merge(metrics.run_time)
+            workers.append({
+                "queue_depth": len(worker.tasks),
+                **counters,
+                "wait_time": metrics.wait_time.snapshot(),
+                "run_time": metrics.run_time.snapshot(),
+            })
+        return {
+            "queue_depth": sum(w["queue_depth"] for w in workers),
+            "delayed": len(self.delay_queue.heap),
+            **totals,
+            "wait_time": wait_time.snapshot(),
+            "run_time": run_time.snapshot(),
+            "workers": workers,
+        }
 
     def run(self):
+        self.delay_queue.start()
         for worker in self.workers:
             worker.start()
 
     def shutdown(self):
-        for q in self.queues:
-            q.join()
+        with self.all_done:
+            while self.unfinished:
+                self.all_done.wait()
+        self.delay_queue.stop()
         for worker in self.workers:
             worker.stop()
+        with self.work_available:
+            self.work_available.notify_all()
+        self.delay_queue.join()
         for worker in self.workers:
             worker.join()
+            worker.close()
+
+class AsyncScheduler:
+    """
+    Scheduler for I/O-bound coroutine functions, with the same submit/run/shutdown API and retry semantics.
+    Every task is a coroutine on one event loop, run by a background thread, so tens of thousands of tasks in flight
+    cost a coroutine each rather than an OS thread. An asyncio.Semaphore bounds how many run at once; a task waiting
+    out its backoff does not hold a slot.
+    """
+    def __init__(self, max_concurrency=1000, log=None):
+        self.log = log
+        self.loop = asyncio.new_event_loop()
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.futures = set()
+        self.lock = threading.Lock()
+
+    def submit(self, func, args=(), max_retries=MAX_RETRIES, backoff=None) -> Future:
+        """Schedule await func(*args) from any thread; returns a Future for its result or final exception."""
+        future = asyncio.run_coroutine_threadsafe(self.execute(func, args, max_retries, backoff or Backoff()), self.loop)
+        with self.lock:
+            self.futures.add(future)
+        future.add_done_callback(self.task_done)
+        return future
+
+    def task_done(self, future):
+        with self.lock:
+            self.futures.discard(future)
+
+    async def execute(self, func, args, max_retries, backoff):
+        retries = 0
+        while True:
+            async with self.semaphore:
+                try:
+                    return await func(*args)
+                except Exception as e:
+                    if retries >= max_retries:
+                        raise
+                    if self.log:
+                        self.log(f"Task failed: {e}")
+            retries += 1
+            await asyncio.sleep(backoff.delay(retries))
+
+    def run(self):
+        self.thread.start()
+
+    def shutdown(self):
+        while True:
+            with self.lock:
+                pending = list(self.futures)
+            if not pending:
+                break
+            wait(pending)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.loop.close()
+
+async def fetch(delay):
+    await asyncio.sleep(delay)
+    return delay
+
+def benchmark_async(num_tasks=50_000):
+    """50k concurrent 100ms I/O waits on one event loop."""
+    scheduler = AsyncScheduler(max_concurrency=num_tasks)
+    scheduler.run()
+    start = time.perf_counter()
+    futures = [scheduler.submit(fetch, args=(0.1,)) for _ in range(num_tasks)]
+    scheduler.shutdown()
+    assert all(f.result() == 0.1 for f in futures)
+    print(f"[asyncio] {num_tasks} tasks in {time.perf_counter() - start:.2f}s")
+
+@register
+def count_primes(limit):
+    return sum(all(n % d for d in range(2, int(n ** 0.5) + 1)) for n in range(2, limit))
+
+@register
+def zeroed_buffer(size):
+    return bytes(size)
+
+def benchmark_cpu(num_tasks=16, limit=40_000):
+    """CPU-bound tasks on threads vs processes, one worker per core."""
+    num_workers = os.cpu_count()
+    for processes in (False, True):
+        scheduler = Scheduler(num_workers, processes=processes)
+        scheduler.run()
+        start = time.perf_counter()
+        futures = [scheduler.submit(count_primes, args=(limit,)) for _ in range(num_tasks)]
+        [f.result() for f in futures]
+        scheduler.shutdown()
+        mode = "processes" if processes else "threads"
+        print(f"[{mode} x{num_workers}] {num_tasks / (time.perf_counter() - start):.1f} tasks/s")
+
+def benchmark(num_workers=4, num_tasks=400):
+    """Skewed durations (10% of tasks are 25x slower): end-to-end latency with round-robin only vs work stealing."""
+    for work_stealing in (False, True):
+        rng = random.Random(7)
+        latencies = []
+
+        def job(duration, submitted):
+            def run():
+                time.sleep(duration)
+                latencies.append(time.perf_counter() - submitted)
+            return run
+
+        scheduler = Scheduler(num_workers, work_stealing)
+        scheduler.run()
+        start = time.perf_counter()
+        for _ in range(num_tasks):
+            scheduler.submit(job(0.05 if rng.random() < 0.1 else 0.002, time.perf_counter()))
+        scheduler.shutdown()
+        elapsed = time.perf_counter() - start
+        latencies.sort()
+        p50, p99 = latencies[len(latencies) // 2], latencies[int(len(latencies) * 0.99)]
+        mode = "work stealing" if work_stealing else "round-robin"
+        print(f"[{mode}] makespan {elapsed:.2f}s, p50 {p50 * 1000:.0f}ms, p99 {p99 * 1000:.0f}ms")
 
 def flaky_task():
     if random.random() < 0.3:
@@ -90,11 +581,30 @@ def flaky_task():
 def sort():
     a = sorted([5,45,45,9,2,7,12,785,12,98])
     print(f"Task succeeded: {a}")
+    return a
+
+if __name__ == "__main__":
+    scheduler = Scheduler(num_workers=4, log=print)
+
+    flaky = scheduler.submit(flaky_task, max_retries=5, backoff=Backoff(base=0.05, cap=1.0))
+    sorted_list = scheduler.submit(sort)
+    urgent = scheduler.submit(lambda: "jumped the queue", priority=-1)
+    dropped = scheduler.submit(sort)
+    dropped.cancel()
 
-scheduler = Scheduler(num_workers=4)
+    scheduler.run()
+    print(urgent.result(), sorted_list.result(), dropped.cancelled())
+    scheduler.shutdown()
+    stats = scheduler.metrics()
+    print({name: stats[name] for name in ("runs", "failures", "retries", "cancelled", "wait_time", "run_time")})
 
-scheduler.submit(flaky_task)
-scheduler.submit(sort)
+    benchmark()
 
-scheduler.run()
-scheduler.shutdown()
+    pool = Scheduler(num_workers=2, processes=True)
+    pool.run()
+    primes = pool.submit(count_primes, args=(10_000,))
+    blob = pool.submit(zeroed_buffer, args=(1 << 20,))  # 1 MiB result travels through shared memory
+    print(primes.result(), len(blob.result()))
+    pool.shutdown()
+    benchmark_cpu()
+    benchmark_async()
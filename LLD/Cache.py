@@ -1,4 +1,19 @@
 from abc import ABC, abstractmethod
+from collections import OrderedDict
+from concurrent.futures import Future
+from multiprocessing import Lock as MP_Lock, Process, shared_memory
+from threading import Event, Lock, Thread
+from time import monotonic, perf_counter, sleep
+import math
+import mmap
+import os
+import pickle
+import random
+import sqlite3
+import struct
+import sys
+import tempfile
+import zlib
 
 class AbstractCache(ABC):
     @abstractmethod
@@ -24,6 +39,16 @@ class EvictionPolicy(ABC):
         """Return the key to be evicted based on the policy."""
         pass
 
+    @abstractmethod
+    def remove_key(self, key):
+        """Forget a key that left the cache without being chosen by evict_key."""
+        pass
+
+    @abstractmethod
+    def eviction_order(self) -> list:
+        """Tracked keys, next victim first. Replaying key_accessed in this order rebuilds the recency order."""
+        pass
+
 class Storage(ABC):
     @abstractmethod
     def get(self, key):
@@ -41,28 +66,272 @@ class Storage(ABC):
     def size(self):
         pass
 
+    def get_many(self, keys) -> dict:
+        """Values for the keys that are present. Backends with a cheaper bulk read override this."""
+        values = {}
+        for key in keys:
+            value = self.get(key)
+            if value is not None:
+                values[key] = value
+        return values
+
+    def put_many(self, items: dict):
+        for key, value in items.items():
+            self.put(key, value)
+
+class TimingWheel:
+    """
+    Hierarchical timing wheel: `levels` wheels of `slots` buckets, level k bucket spanning slots**k ticks of `resolution` seconds.
+    Scheduling and cancelling are O(1); advance() cascades coarse buckets down as their turn comes, so expiry is
+    amortised O(1) per key and never scans every deadline. Keys fire at most one tick late, never early.
+    While level 0 is empty advance() jumps straight to the next boundary of the lowest occupied level, so a long
+    idle gap costs a handful of cascades rather than one step per tick.
+    """
+    def __init__(self, resolution: float = 0.1, slots: int = 64, levels: int = 4, now: float = 0.0):
+        self.resolution = resolution
+        self.slots = slots
+        self.levels = levels
+        self.wheels = [[set() for _ in range(slots)] for _ in range(levels)]
+        self.tick = int(now / resolution)  # every tick before this one has fired
+        self.deadlines = {}
+        self.buckets = {}  # key -> (level, bucket)
+        self.sizes = [0] * levels  # keys held on each level
+
+    def schedule(self, key, deadline: float):
+        self.cancel(key)
+        self.deadlines[key] = deadline
+        self.place(key)
+
+    def place(self, key):
+        due = max(math.ceil(self.deadlines[key] / self.resolution), self.tick)
+        level, span = 0, self.slots
+        while due - self.tick >= span and level < self.levels - 1:
+            level += 1
+            span *= self.slots
+        bucket = self.wheels[level][(due // self.slots ** level) % self.slots]
+        bucket.add(key)
+        self.buckets[key] = (level, bucket)
+        self.sizes[level] += 1
+
+    def cancel(self, key):
+        entry = self.buckets.pop(key, None)
+        if entry is not None:
+            level, bucket = entry
+            bucket.discard(key)
+            self.sizes[level] -= 1
+            del self.deadlines[key]
+
+    def advance(self, now: float) -> list:
+        """Fire every tick up to now. Returns the keys that expired."""
+        target = int(now / self.resolution)
+        if not self.deadlines:
+            self.tick = max(self.tick, target + 1)
+            return []
+        expired = []
+        while self.tick <= target:
+            for level in range(1, self.levels):
+                span = self.slots ** level
+                if self.tick % span:
+                    break
+                bucket = self.wheels[level][(self.tick // span) % self.slots]
+                keys = list(bucket)
+                bucket.clear()
+                self.sizes[level] -= len(keys)
+                for key in keys:
+                    self.place(key)
+            bucket = self.wheels[0][self.tick % self.slots]
+            for key in bucket:
+                del self.buckets[key]
+                del self.deadlines[key]
+            self.sizes[0] -= len(bucket)
+            expired.extend(bucket)
+            bucket.clear()
+            self.tick += 1
+            if not self.sizes[0]:
+                self.tick = min(self.next_cascade(), target + 1)
+        return expired
+
+    def next_cascade(self) -> int:
+        """First tick from self.tick on that cascades an occupied level, or infinity if the wheel is empty."""
+        for level in range(1, self.levels):
+            if self.sizes[level]:
+                span = self.slots ** level
+                return -(-self.tick // span) * span
+        return math.inf
+
+def unit_weigher(key, value) -> int:
+    return 1
+
+def size_weigher(key, value) -> int:
+    """Byte length of buffer-like values (bytes, bytearray, array, memoryview), sys.getsizeof of anything else."""
+    try:
+        return memoryview(value).nbytes
+    except TypeError:
+        return sys.getsizeof(value)
+
 class Cache(AbstractCache):
-    def __init__(self, eviction_policy: EvictionPolicy, storage: Storage, capacity: int):
+    """
+    capacity bounds the total weight of the entries. The default unit_weigher counts entries;
+    pass weigher=size_weigher (or any (key, value) -> int) to bound memory instead.
+    """
+    def __init__(self, eviction_policy: EvictionPolicy, storage: Storage, capacity: int,
+                 default_ttl: float = None, clock=monotonic, weigher=unit_weigher):
         self.capacity = capacity
         self.eviction_policy = eviction_policy
         self.storage = storage
+        self.default_ttl = default_ttl
+        self.clock = clock
+        self.expiry = TimingWheel(now=clock())
+        self.weigher = weigher
+        self.weights = {}
+        self.weight = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = {"size": 0, "expired": 0, "explicit": 0}
     
     def get(self, key):
+        deadline = self.expiry.deadlines.get(key)
+        if deadline is not None and deadline <= self.clock():
+            self.discard(key, "expired")
+            self.misses += 1
+            return None
         value = self.storage.get(key)
         if value is not None:
             self.eviction_policy.key_accessed(key)
+            self.hits += 1
+        else:
+            self.misses += 1
         return value
     
-    def put(self, key, value):
-        if self.storage.size() >= self.capacity:
-            key_to_evict = self.eviction_policy.evict_key()
-            self.storage.remove(key_to_evict)
+    def put(self, key, value, ttl: float = None):
+        """
+        Store value; it expires after ttl seconds, or default_ttl when ttl is None.
+        Expired entries are reclaimed first, then victims are evicted until the new weight fits.
+        A value heavier than the whole capacity is not cached.
+        """
+        weight = self.weigher(key, value)
+        if weight > self.capacity:
+            if key in self.weights:
+                self.discard(key, "size")
+            return
+
+        if self.weight - self.weights.get(key, 0) + weight > self.capacity:
+            if self.expiry.deadlines:
+                self.expire()
+            while self.weight - self.weights.get(key, 0) + weight > self.capacity:
+                self.discard(self.eviction_policy.evict_key(), "size")
 
         self.storage.put(key, value)
         self.eviction_policy.key_accessed(key)
+        self.weight += weight - self.weights.get(key, 0)
+        self.weights[key] = weight
+        ttl = self.default_ttl if ttl is None else ttl
+        if ttl is None:
+            self.expiry.cancel(key)
+        else:
+            self.expiry.schedule(key, self.clock() + ttl)
     
     def evict(self, key):
+        if key in self.weights:
+            self.discard(key, "explicit")
+
+    def discard(self, key, cause: str):
         self.storage.remove(key)
+        self.eviction_policy.remove_key(key)
+        self.expiry.cancel(key)
+        self.weight -= self.weights.pop(key, 0)
+        self.evictions[cause] += 1
+
+    def expire(self) -> int:
+        """Drop every entry whose TTL has passed. Returns how many were dropped."""
+        expired = self.expiry.advance(self.clock())
+        for key in expired:
+            self.discard(key, "expired")
+        return len(expired)
+
+    def snapshot(self, path: str) -> int:
+        """
+        Write every live entry to path in eviction order; returns the number written. Layout: header
+        (magic, count, index offset), pickled values back to back, then an index of
+        (key length, value offset, value length, weight, remaining ttl or NaN) records each followed by its pickled key.
+        The snapshot is written to a temporary file beside path and swapped in with os.replace, so a mapping of the
+        previous snapshot (restore then snapshot to the same path) stays valid and a failed write leaves it intact.
+        """
+        now = self.clock()
+        index = []
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                self.write_snapshot(f, now, index)
+            os.replace(temp_path, path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+        return len(index)
+
+    def write_snapshot(self, f, now: float, index: list):
+        f.write(SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, 0, 0))
+        for key in self.eviction_policy.eviction_order():
+            value = self.storage.get(key)
+            if value is None:
+                continue
+            deadline = self.expiry.deadlines.get(key)
+            if deadline is not None and deadline <= now:
+                continue
+            value = pickle.dumps(bytes(value) if isinstance(value, memoryview) else value, pickle.HIGHEST_PROTOCOL)
+            ttl = math.nan if deadline is None else deadline - now
+            index.append((pickle.dumps(key, pickle.HIGHEST_PROTOCOL), f.tell(), len(value), self.weights[key], ttl))
+            f.write(value)
+        index_offset = f.tell()
+        for key, offset, length, weight, ttl in index:
+            f.write(SNAPSHOT_RECORD.pack(len(key), offset, length, weight, ttl))
+            f.write(key)
+        f.seek(0)
+        f.write(SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, len(index), index_offset))
+
+    def restore(self, path: str) -> int:
+        """
+        Load a snapshot written by snapshot(). Keys, weights, TTLs and eviction order are rebuilt up front, but values stay in
+        the memory-mapped file until first read, so startup costs O(keys) rather than O(bytes). Entries beyond capacity are
+        evicted by the policy as usual. The file stays mapped until every restored entry has been read or evicted, or
+        release_snapshot() is called. Returns the number of entries restored.
+        """
+        self.release_snapshot()
+        self.storage = SnapshotStorage(self.storage, path, on_drained=self.release_snapshot)
+        now = self.clock()
+        for key, (_, _, weight, ttl) in self.storage.index.items():
+            self.eviction_policy.key_accessed(key)
+            self.weight += weight - self.weights.get(key, 0)
+            self.weights[key] = weight
+            if not math.isnan(ttl):
+                self.expiry.schedule(key, now + ttl)
+        while self.weight > self.capacity:
+            self.discard(self.eviction_policy.evict_key(), "size")
+        restored = len(self.weights)
+        if isinstance(self.storage, SnapshotStorage) and not self.storage.index:
+            self.release_snapshot()
+        return restored
+
+    def release_snapshot(self):
+        """Copy entries still held only in a restored snapshot into the underlying storage, unmap the file and unwrap."""
+        snapshot = self.storage
+        if not isinstance(snapshot, SnapshotStorage):
+            return
+        snapshot.on_drained = None
+        for key in list(snapshot.index):
+            snapshot.get(key)
+        snapshot.close()
+        self.storage = snapshot.storage
+
+    def stats(self) -> dict:
+        return {
+            "weight": self.weight,
+            "capacity": self.capacity,
+            "entries": len(self.weights),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": dict(self.evictions),
+        }
 
 class Node:
     def __init__(self, data=None):
@@ -79,7 +348,6 @@ class LRU(EvictionPolicy):
         self.keys = {}
 
     def key_accessed(self, key):
-        mru = self.mru.prev
         if key not in self.keys:
             node = Node(key)
         else:
@@ -87,6 +355,7 @@ class LRU(EvictionPolicy):
             node.prev.next = node.next
             node.next.prev = node.prev
 
+        mru = self.mru.prev
         mru.next = node
         node.prev = mru
         node.next = self.mru
@@ -103,6 +372,200 @@ class LRU(EvictionPolicy):
         del self.keys[evicted_key]
         return evicted_key
 
+    def remove_key(self, key):
+        node = self.keys.pop(key, None)
+        if node:
+            node.prev.next = node.next
+            node.next.prev = node.prev
+
+    def eviction_order(self) -> list:
+        keys, node = [], self.lru.next
+        while node is not self.mru:
+            keys.append(node.data)
+            node = node.next
+        return keys
+
+class FrequencyNode(Node):
+    """A bucket of keys sharing one access count, in LRU order; buckets form a list sorted by count."""
+    def __init__(self, frequency=0):
+        super().__init__(OrderedDict())
+        self.frequency = frequency
+
+class LFU(EvictionPolicy):
+    """O(1) LFU: every key lives in the bucket for its count, so bumping a key only moves it to the neighbouring bucket."""
+    def __init__(self):
+        self.head = FrequencyNode()  # sentinel; head.next is the lowest count
+        self.head.next = self.head.prev = self.head
+        self.buckets = {}
+
+    def unlink_if_empty(self, bucket):
+        if not bucket.data:
+            bucket.prev.next = bucket.next
+            bucket.next.prev = bucket.prev
+
+    def key_accessed(self, key):
+        bucket = self.buckets.get(key, self.head)
+        target = bucket.next
+        if target.frequency != bucket.frequency + 1:
+            target = FrequencyNode(bucket.frequency + 1)
+            target.prev, target.next = bucket, bucket.next
+            bucket.next.prev = target
+            bucket.next = target
+        if bucket is not self.head:
+            del bucket.data[key]
+            self.unlink_if_empty(bucket)
+        target.data[key] = None
+        self.buckets[key] = target
+
+    def evict_key(self):
+        bucket = self.head.next
+        key, _ = bucket.data.popitem(last=False)
+        del self.buckets[key]
+        self.unlink_if_empty(bucket)
+        return key
+
+    def remove_key(self, key):
+        bucket = self.buckets.pop(key, None)
+        if bucket:
+            del bucket.data[key]
+            self.unlink_if_empty(bucket)
+
+    def eviction_order(self) -> list:
+        keys, bucket = [], self.head.next
+        while bucket is not self.head:
+            keys.extend(bucket.data)
+            bucket = bucket.next
+        return keys
+
+class ARC(EvictionPolicy):
+    """
+    Adaptive Replacement Cache. t1/t2 hold resident keys seen once/more than once; b1/b2 are ghost lists of their
+    recent evictions. A ghost hit moves the target size p of t1 towards the list that would have kept the key.
+    """
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.p = 0
+        self.t1, self.t2, self.b1, self.b2 = OrderedDict(), OrderedDict(), OrderedDict(), OrderedDict()
+
+    def key_accessed(self, key):
+        if key in self.t1:
+            del self.t1[key]
+            self.t2[key] = None
+        elif key in self.t2:
+            self.t2.move_to_end(key)
+        elif key in self.b1:
+            self.p = min(self.capacity, self.p + max(len(self.b2) // len(self.b1), 1))
+            del self.b1[key]
+            self.t2[key] = None
+        elif key in self.b2:
+            self.p = max(0, self.p - max(len(self.b1) // len(self.b2), 1))
+            del self.b2[key]
+            self.t2[key] = None
+        else:
+            self.t1[key] = None
+            if len(self.t1) + len(self.b1) > self.capacity and self.b1:
+                self.b1.popitem(last=False)
+            if len(self.t1) + len(self.t2) + len(self.b1) + len(self.b2) > 2 * self.capacity and self.b2:
+                self.b2.popitem(last=False)
+
+    def evict_key(self):
+        if self.t1 and (len(self.t1) > self.p or not self.t2):
+            key, _ = self.t1.popitem(last=False)
+            self.b1[key] = None
+        else:
+            key, _ = self.t2.popitem(last=False)
+            self.b2[key] = None
+        return key
+
+    def remove_key(self, key):
+        for keys in (self.t1, self.t2):
+            keys.pop(key, None)
+
+    def eviction_order(self) -> list:
+        return list(self.t1) + list(self.t2)
+
+class CountMinSketch:
+    """4-row count-min sketch of 4-bit counters. Every sample_size increments all counters are halved, so old popularity fades."""
+    SEEDS = (0x9E3779B97F4A7C15, 0xC2B2AE3D27D4EB4F, 0x165667B19E3779F9, 0xD6E8FEB86659FD93)
+
+    def __init__(self, capacity: int):
+        self.bits = max(4, (4 * capacity - 1).bit_length())
+        self.width = 1 << self.bits
+        self.table = bytearray(len(self.SEEDS) * self.width)
+        self.sample_size = 10 * capacity
+        self.additions = 0
+
+    def indexes(self, key):
+        h = hash(key)
+        shift = 64 - self.bits
+        return [row * self.width + (((h * seed) & 0xFFFFFFFFFFFFFFFF) >> shift) for row, seed in enumerate(self.SEEDS)]
+
+    def increment(self, key):
+        table = self.table
+        for i in self.indexes(key):
+            if table[i] < 15:
+                table[i] += 1
+        self.additions += 1
+        if self.additions >= self.sample_size:
+            self.table = bytearray(c >> 1 for c in table)
+            self.additions //= 2
+
+    def estimate(self, key) -> int:
+        table = self.table
+        return min(table[i] for i in self.indexes(key))
+
+class WTinyLFU(EvictionPolicy):
+    """
+    W-TinyLFU: new keys enter a small LRU window (1% of capacity); the main area is a segmented LRU
+    (probation + 80% protected). A key leaving the window is admitted to main only if the frequency sketch
+    rates it above main's probation victim, so one-off scans cannot flush the frequently used set.
+    """
+    def __init__(self, capacity: int):
+        self.window_capacity = max(1, capacity // 100)
+        self.protected_capacity = max(1, (capacity - self.window_capacity) * 4 // 5)
+        self.window, self.probation, self.protected = OrderedDict(), OrderedDict(), OrderedDict()
+        self.sketch = CountMinSketch(capacity)
+
+    def key_accessed(self, key):
+        self.sketch.increment(key)
+        if key in self.window:
+            self.window.move_to_end(key)
+        elif key in self.probation:
+            del self.probation[key]
+            self.protected[key] = None
+            if len(self.protected) > self.protected_capacity:
+                demoted, _ = self.protected.popitem(last=False)
+                self.probation[demoted] = None
+        elif key in self.protected:
+            self.protected.move_to_end(key)
+        else:
+            self.window[key] = None
+            if len(self.window) > self.window_capacity:
+                overflow, _ = self.window.popitem(last=False)
+                self.probation[overflow] = None
+
+    def evict_key(self):
+        if len(self.window) < self.window_capacity or not (self.probation or self.protected):
+            main = self.probation or self.protected or self.window
+            key, _ = main.popitem(last=False)
+            return key
+
+        candidate, _ = self.window.popitem(last=False)
+        main = self.probation or self.protected
+        victim = next(iter(main))
+        if self.sketch.estimate(candidate) > self.sketch.estimate(victim):
+            del main[victim]
+            self.probation[candidate] = None
+            return victim
+        return candidate
+
+    def remove_key(self, key):
+        for keys in (self.window, self.probation, self.protected):
+            keys.pop(key, None)
+
+    def eviction_order(self) -> list:
+        return list(self.probation) + list(self.protected) + list(self.window)
+
 class HashMap(Storage):
     def __init__(self):
         self.data = {}
@@ -120,11 +583,580 @@ class HashMap(Storage):
     def size(self):
         return len(self.data)
 
-cache = Cache(LRU(), HashMap(), 3)
-cache.put("a", 1)
-cache.put("b", 2)
-cache.put("c", 3)
-print(cache.get("a")) # Accessing 'a' moves it to the most recently used
-cache.put("d", 4)  # Evicts 'b' (Least Recently Used)
-print(cache.get("b"))  # None, because 'b' was evicted
-print(cache.get("a"))  # 1, because 'a' was recently used
+class SharedMemoryStorage(Storage):
+    """
+    Open-addressing hash table of fixed-size slots in a multiprocessing.shared_memory block, shared by every process
+    that attaches to it by name. Keys are str/bytes up to key_size bytes; values are bytes-like up to value_size bytes
+    and are stored raw, without pickling. get() returns a zero-copy memoryview into the block.
+    Layout: header (count, slots, key_size, value_size, generation), then slots of (state, key length, value length,
+    key, value), probed linearly from crc32(key). Writers serialise on lock (a multiprocessing.Lock passed to every
+    process) and make the generation odd while they write; readers take no lock and retry a lookup that overlapped
+    a write, so they never see a torn value. An overwrite goes to a fresh slot whose state byte is set last and the
+    old slot is then tombstoned, so a view returned by get() keeps its bytes until that slot is reused by a later put
+    (only a full table overwrites in place); get(key, copy=True) returns a copy taken inside the consistency check.
+    Eviction policy state is per process, so give one process ownership of writes through a Cache if it must stay bounded.
+    """
+    HEADER = struct.Struct('<QQQQQ')
+    COUNTER = struct.Struct('<Q')
+    GENERATION = 32  # offset of the generation counter in the header
+    SLOT = struct.Struct('<BHI')
+    LENGTHS = struct.Struct('<HI')
+    EMPTY, USED, TOMBSTONE = 0, 1, 2
+
+    def __init__(self, slots: int = 1024, key_size: int = 64, value_size: int = 1024, name: str = None, lock=None):
+        """
+        Create a new table, or attach to the existing block called name (its layout is read from the header).
+        Attaching requires the creator's lock; a private one would let this process write without exclusion.
+        """
+        if name is not None and lock is None:
+            raise ValueError("Attaching to an existing table requires the lock it was created with.")
+        self.lock = lock or MP_Lock()
+        if name is None:
+            size = self.HEADER.size + slots * (self.SLOT.size + key_size + value_size)
+            self.shm = shared_memory.SharedMemory(create=True, size=size)
+            self.HEADER.pack_into(self.shm.buf, 0, 0, slots, key_size, value_size, 0)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+        self.name = self.shm.name
+        self.buf = self.shm.buf
+        _, self.slots, self.key_size, self.value_size, _ = self.HEADER.unpack_from(self.buf, 0)
+        self.slot_size = self.SLOT.size + self.key_size + self.value_size
+
+    def encode(self, key) -> bytes:
+        key = key.encode() if isinstance(key, str) else bytes(key)
+        if len(key) > self.key_size:
+            raise ValueError(f"Key of {len(key)} bytes exceeds key_size {self.key_size}.")
+        return key
+
+    def find(self, key: bytes, free: bool = False):
+        """
+        (offset of the slot holding key or None, offset of the first reusable slot on its probe path or None).
+        The reusable slot is only searched for when free is true.
+        """
+        buf, slot = self.buf, self.SLOT
+        start = zlib.crc32(key) % self.slots
+        found = reusable = None
+        for probe in range(self.slots):
+            offset = self.HEADER.size + ((start + probe) % self.slots) * self.slot_size
+            state, key_length, _ = slot.unpack_from(buf, offset)
+            if state == self.EMPTY:
+                return found, (offset if reusable is None else reusable)
+            if state == self.TOMBSTONE:
+                if reusable is None:
+                    reusable = offset
+            elif found is None and key_length == len(key) and buf[offset + slot.size:offset + slot.size + key_length] == key:
+                found = offset
+            if found is not None and (reusable is not None or not free):
+                break
+        return found, reusable
+
+    def get(self, key, copy: bool = False):
+        """
+        Zero-copy view of key's value, consistent when returned. With copy=True the bytes are copied inside the
+        consistency check, so the result is never torn even if another process rewrites the slot right after.
+        """
+        key, buf = self.encode(key), self.buf
+        while True:
+            generation = self.COUNTER.unpack_from(buf, self.GENERATION)[0]
+            if generation & 1:
+                continue  # a write is in progress
+            offset, _ = self.find(key)
+            value = None
+            if offset is not None:
+                _, _, value_length = self.SLOT.unpack_from(buf, offset)
+                start = offset + self.SLOT.size + self.key_size
+                value = bytes(buf[start:start + value_length]) if copy else buf[start:start + value_length]
+            if self.COUNTER.unpack_from(buf, self.GENERATION)[0] == generation:
+                return value
+            if isinstance(value, memoryview):
+                value.release()
+
+    def begin_write(self):
+        self.COUNTER.pack_into(self.buf, self.GENERATION, self.COUNTER.unpack_from(self.buf, self.GENERATION)[0] + 1)
+
+    end_write = begin_write
+
+    def put(self, key, value):
+        key, value = self.encode(key), memoryview(value).cast('B')
+        if len(value) > self.value_size:
+            raise ValueError(f"Value of {len(value)} bytes exceeds value_size {self.value_size}.")
+        with self.lock:
+            found, reusable = self.find(key, free=True)
+            offset = found if reusable is None else reusable
+            if offset is None:
+                raise MemoryError(f"Shared table {self.name} is full ({self.slots} slots).")
+            buf, start = self.buf, offset + self.SLOT.size
+            self.begin_write()
+            try:
+                buf[start:start + len(key)] = key
+                buf[start + self.key_size:start + self.key_size + len(value)] = value
+                self.LENGTHS.pack_into(buf, offset + 1, len(key), len(value))
+                buf[offset] = self.USED  # publish the slot last
+                if found is None:
+                    self.COUNTER.pack_into(buf, 0, self.size() + 1)
+                elif found != offset:
+                    buf[found] = self.TOMBSTONE
+            finally:
+                self.end_write()
+
+    def remove(self, key):
+        key = self.encode(key)
+        with self.lock:
+            offset, _ = self.find(key)
+            if offset is not None:
+                self.begin_write()
+                try:
+                    self.SLOT.pack_into(self.buf, offset, self.TOMBSTONE, 0, 0)
+                    self.COUNTER.pack_into(self.buf, 0, self.size() - 1)
+                finally:
+                    self.end_write()
+
+    def size(self):
+        return struct.unpack_from('<Q', self.buf, 0)[0]
+
+    def close(self):
+        """Detach from the block. Every memoryview returned by get() must have been released first."""
+        self.buf = None
+        self.shm.close()
+
+    def unlink(self):
+        """Free the block; call once, from the creating process, after every process has closed it."""
+        self.shm.unlink()
+
+SNAPSHOT_MAGIC = b"NAILSNAP"
+SNAPSHOT_HEADER = struct.Struct('<8sQQ')
+SNAPSHOT_RECORD = struct.Struct('<IQQqd')
+
+class SnapshotStorage(Storage):
+    """
+    Storage layered over a memory-mapped Cache snapshot. A key still in the snapshot is unpickled from the mapping on
+    first get() and moved into the wrapped storage; puts and removes go straight to the wrapped storage.
+    Once no key is left in the snapshot the file is unmapped and on_drained, if given, is called.
+    """
+    def __init__(self, storage: Storage, path: str, on_drained=None):
+        self.storage = storage
+        self.on_drained = on_drained
+        with open(path, 'rb') as f:
+            self.mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, count, offset = SNAPSHOT_HEADER.unpack_from(self.mmap, 0)
+        if magic != SNAPSHOT_MAGIC:
+            raise ValueError(f"{path} is not a cache snapshot.")
+        self.index = {}  # key -> (value offset, value length, weight, ttl), in eviction order
+        for _ in range(count):
+            key_length, value_offset, value_length, weight, ttl = SNAPSHOT_RECORD.unpack_from(self.mmap, offset)
+            offset += SNAPSHOT_RECORD.size
+            key = pickle.loads(self.mmap[offset:offset + key_length])
+            offset += key_length
+            self.index[key] = (value_offset, value_length, weight, ttl)
+
+    def get(self, key):
+        value = self.storage.get(key)
+        if value is None and key in self.index:
+            offset, length, _, _ = self.index.pop(key)
+            value = pickle.loads(self.mmap[offset:offset + length])
+            self.storage.put(key, value)
+            self.drained()
+        return value
+
+    def put(self, key, value):
+        self.storage.put(key, value)
+        if self.index.pop(key, None) is not None:
+            self.drained()
+
+    def remove(self, key):
+        self.storage.remove(key)
+        if self.index.pop(key, None) is not None:
+            self.drained()
+
+    def size(self):
+        return self.storage.size() + len(self.index)
+
+    def drained(self):
+        if not self.index:
+            self.close()
+            if self.on_drained is not None:
+                self.on_drained()
+
+    def close(self):
+        """Unmap the snapshot file. Keys not yet read from it are dropped."""
+        self.index.clear()
+        if not self.mmap.closed:
+            self.mmap.close()
+
+class SQLiteStorage(Storage):
+    """Storage in a SQLite table with pickled values; the reference backing store for loaders and write-behind."""
+    def __init__(self, path: str = ":memory:"):
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("CREATE TABLE IF NOT EXISTS cache (key BLOB PRIMARY KEY, value BLOB)")
+        self.lock = Lock()
+
+    def get(self, key):
+        with self.lock:
+            row = self.db.execute("SELECT value FROM cache WHERE key = ?", (pickle.dumps(key),)).fetchone()
+        return pickle.loads(row[0]) if row else None
+
+    def get_many(self, keys) -> dict:
+        keys = list(keys)
+        values = {}
+        with self.lock:
+            for start in range(0, len(keys), 500):
+                chunk = [pickle.dumps(key) for key in keys[start:start + 500]]
+                query = f"SELECT key, value FROM cache WHERE key IN ({','.join('?' * len(chunk))})"
+                for key, value in self.db.execute(query, chunk):
+                    values[pickle.loads(key)] = pickle.loads(value)
+        return values
+
+    def put(self, key, value):
+        self.put_many({key: value})
+
+    def put_many(self, items: dict):
+        rows = [(pickle.dumps(key), pickle.dumps(value)) for key, value in items.items()]
+        with self.lock, self.db:
+            self.db.executemany("INSERT OR REPLACE INTO cache (key, value) VALUES (?, ?)", rows)
+
+    def remove(self, key):
+        with self.lock, self.db:
+            self.db.execute("DELETE FROM cache WHERE key = ?", (pickle.dumps(key),))
+
+    def size(self):
+        with self.lock:
+            return self.db.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+
+class ConcurrentCache(AbstractCache):
+    """
+    Lock-striped cache: keys hash into N segments, each a Cache with its own storage, eviction policy and lock.
+    Threads touching different segments never contend; capacity is split evenly across segments.
+    """
+    def __init__(self, eviction_policy_factory, storage_factory, capacity: int, segments: int = 16,
+                 default_ttl: float = None, weigher=unit_weigher):
+        segment_capacity = -(-capacity // segments)
+        self.capacity = capacity
+        self.segments = [Cache(eviction_policy_factory(), storage_factory(), segment_capacity, default_ttl, weigher=weigher)
+                         for _ in range(segments)]
+        self.locks = [Lock() for _ in range(segments)]
+
+    def segment_for(self, key) -> int:
+        return hash(key) % len(self.segments)
+
+    def get(self, key):
+        i = self.segment_for(key)
+        with self.locks[i]:
+            return self.segments[i].get(key)
+
+    def put(self, key, value, ttl: float = None):
+        i = self.segment_for(key)
+        with self.locks[i]:
+            self.segments[i].put(key, value, ttl)
+
+    def evict(self, key):
+        i = self.segment_for(key)
+        with self.locks[i]:
+            self.segments[i].evict(key)
+
+    def expire(self) -> int:
+        expired = 0
+        for lock, segment in zip(self.locks, self.segments):
+            with lock:
+                expired += segment.expire()
+        return expired
+
+    def stats(self) -> dict:
+        total = {"weight": 0, "capacity": self.capacity, "entries": 0, "hits": 0, "misses": 0,
+                 "evictions": {"size": 0, "expired": 0, "explicit": 0}}
+        for lock, segment in zip(self.locks, self.segments):
+            with lock:
+                stats = segment.stats()
+            for name in ("weight", "entries", "hits", "misses"):
+                total[name] += stats[name]
+            for cause, count in stats["evictions"].items():
+                total["evictions"][cause] += count
+        return total
+
+class LoadingCache(AbstractCache):
+    """
+    Read-through, write-behind front for a cache and its backing Storage.
+    A miss is loaded once no matter how many threads ask for the key at the same time; get_many sends every
+    miss to bulk_loader in a single call (backend.get_many by default, or loader once per key when only a custom
+    loader is given, so both paths read from the same source). put() writes the cache straight away and buffers the
+    backend write until flush_size writes are pending or flush() is called.
+    The wrapped cache must be thread-safe (e.g. a ConcurrentCache) if callers share it across threads.
+    """
+    def __init__(self, cache: AbstractCache, backend: Storage, loader=None, flush_size: int = 100, bulk_loader=None):
+        self.cache = cache
+        self.backend = backend
+        self.loader = loader or backend.get
+        if bulk_loader is None:
+            bulk_loader = backend.get_many if loader is None else self.load_each
+        self.bulk_loader = bulk_loader
+        self.flush_size = flush_size
+        self.loading = {}  # key -> Future shared by every caller waiting on that key
+        self.superseded = {}  # key -> value put() while the key was loading
+        self.pending_writes = {}
+        self.flushing = {}  # writes handed to the backend but not yet acknowledged
+        self.lock = Lock()
+
+    def claim(self, keys):
+        """Split keys into pending writes, loads this caller now owns, and loads someone else already started."""
+        buffered, owned, waiting = {}, {}, {}
+        with self.lock:
+            for key in keys:
+                if key in self.pending_writes:
+                    buffered[key] = self.pending_writes[key]
+                elif key in self.flushing:
+                    buffered[key] = self.flushing[key]
+                elif key in self.loading:
+                    waiting[key] = self.loading[key]
+                else:
+                    owned[key] = self.loading[key] = Future()
+        return buffered, owned, waiting
+
+    def settle(self, futures: dict, values: dict = None, error: Exception = None) -> dict:
+        """
+        Finish loads this caller owns: cache the loaded values and resolve the futures. A key put() during its load
+        resolves to the written value and the loaded one is dropped, so a slow load never overwrites a newer write.
+        Returns the resolved values.
+        """
+        resolved = {}
+        with self.lock:
+            for key in futures:
+                del self.loading[key]
+                if key in self.superseded:
+                    resolved[key] = self.superseded.pop(key)
+                elif error is None and values.get(key) is not None:
+                    resolved[key] = values[key]
+                    self.cache.put(key, values[key])
+        for key, future in futures.items():
+            if key in resolved or error is None:
+                future.set_result(resolved.get(key))
+            else:
+                future.set_exception(error)
+        return resolved
+
+    def get(self, key):
+        value = self.cache.get(key)
+        if value is not None:
+            return value
+        buffered, owned, waiting = self.claim([key])
+        if buffered:
+            return buffered[key]
+        if waiting:
+            return waiting[key].result()
+        try:
+            value = self.loader(key)
+        except Exception as e:
+            self.settle(owned, error=e)
+            raise
+        return self.settle(owned, {key: value}).get(key)
+
+    def get_many(self, keys) -> dict:
+        values, misses = {}, []
+        for key in keys:
+            value = self.cache.get(key)
+            if value is None:
+                misses.append(key)
+            else:
+                values[key] = value
+        buffered, owned, waiting = self.claim(misses)
+        values.update(buffered)
+        if owned:
+            values.update(self.load_many(owned))
+        for key, future in waiting.items():
+            value = future.result()
+            if value is not None:
+                values[key] = value
+        return values
+
+    def load_each(self, keys) -> dict:
+        values = {}
+        for key in keys:
+            value = self.loader(key)
+            if value is not None:
+                values[key] = value
+        return values
+
+    def load_many(self, owned: dict) -> dict:
+        try:
+            loaded = self.bulk_loader(list(owned))
+        except Exception as e:
+            self.settle(owned, error=e)
+            raise
+        return self.settle(owned, loaded)
+
+    def put(self, key, value):
+        with self.lock:
+            self.cache.put(key, value)
+            self.pending_writes[key] = value
+            if key in self.loading:
+                self.superseded[key] = value
+            full = len(self.pending_writes) >= self.flush_size
+        if full:
+            self.flush()
+
+    def flush(self):
+        """Write every buffered put to the backend in one put_many call. If it fails the writes stay buffered."""
+        with self.lock:
+            writes, self.pending_writes = self.pending_writes, {}
+            self.flushing = writes
+        if not writes:
+            return
+        try:
+            self.backend.put_many(writes)
+        except Exception:
+            with self.lock:
+                writes.update(self.pending_writes)  # puts made during the failed flush are newer
+                self.pending_writes = writes
+            raise
+        finally:
+            with self.lock:
+                self.flushing = {}
+
+    def evict(self, key):
+        self.cache.evict(key)
+
+class Reaper(Thread):
+    """Background thread that calls cache.expire() every interval seconds. The cache must be thread-safe, e.g. a ConcurrentCache."""
+    def __init__(self, cache: AbstractCache, interval: float = 1.0):
+        super().__init__()
+        self.cache = cache
+        self.interval = interval
+        self.daemon = True
+        self._stop_event = Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            self.cache.expire()
+
+    def stop(self):
+        self._stop_event.set()
+
+def benchmark(threads: int = 8, ops: int = 50_000, keys: int = 10_000):
+    """Mixed 90/10 get/put load from several threads: one global lock (1 segment) against 16 stripes."""
+    for segments in (1, 16):
+        cache = ConcurrentCache(LRU, HashMap, keys // 2, segments)
+
+        def worker(seed):
+            rng = random.Random(seed)
+            for _ in range(ops):
+                key = int(rng.paretovariate(1.2)) % keys
+                if rng.random() < 0.9:
+                    cache.get(key)
+                else:
+                    cache.put(key, key)
+
+        workers = [Thread(target=worker, args=(i,)) for i in range(threads)]
+        start = perf_counter()
+        [w.start() for w in workers]
+        [w.join() for w in workers]
+        elapsed = perf_counter() - start
+        print(f"[{segments} segment(s), {threads} threads] {threads * ops / elapsed:,.0f} ops/s")
+
+def scan_trace(n: int = 200_000, keys: int = 50_000, skew: float = 0.3, scan_every: int = 20_000, scan_length: int = 5_000):
+    """Zipf-like hot set with periodic one-off sequential scans of never-repeated keys."""
+    rng = random.Random(42)
+    trace, fresh = [], keys
+    for i in range(n):
+        if i % scan_every == 0:
+            trace.extend(range(fresh, fresh + scan_length))
+            fresh += scan_length
+        trace.append(int(rng.paretovariate(skew)) % keys)
+    return trace
+
+def replay(cache: AbstractCache, trace: list):
+    """Read-through replay of trace: a miss is followed by a put. Returns (hit ratio, ops/s)."""
+    hits = 0
+    start = perf_counter()
+    for key in trace:
+        if cache.get(key) is None:
+            cache.put(key, key)
+        else:
+            hits += 1
+    return hits / len(trace), len(trace) / (perf_counter() - start)
+
+def compare_policies(capacity: int = 1_000):
+    trace = scan_trace()
+    policies = {
+        "LRU": LRU,
+        "LFU": LFU,
+        "ARC": lambda: ARC(capacity),
+        "W-TinyLFU": lambda: WTinyLFU(capacity),
+    }
+    for name, policy in policies.items():
+        hit_ratio, ops = replay(Cache(policy(), HashMap(), capacity), trace)
+        print(f"[{name}] hit ratio: {hit_ratio:.3f}, {ops:,.0f} ops/s")
+
+def warm(name: str, lock):
+    storage = SharedMemoryStorage(name=name, lock=lock)
+    for i in range(3):
+        storage.put(f"page:{i}", f"<html>{i}</html>".encode())
+    storage.close()
+
+if __name__ == "__main__":
+    cache = Cache(LRU(), HashMap(), 3)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.put("c", 3)
+    print(cache.get("a")) # Accessing 'a' moves it to the most recently used
+    cache.put("d", 4)  # Evicts 'b' (Least Recently Used)
+    print(cache.get("b"))  # None, because 'b' was evicted
+    print(cache.get("a"))  # 1, because 'a' was recently used
+
+    benchmark()
+    compare_policies()
+
+    sessions = ConcurrentCache(LRU, HashMap, 100, segments=4, default_ttl=0.5)
+    reaper = Reaper(sessions, interval=0.1)
+    reaper.start()
+    sessions.put("alice", "token-1")
+    sessions.put("bob", "token-2", ttl=5)
+    sleep(0.7)
+    print(sessions.get("alice"))  # None, expired after the default TTL
+    print(sessions.get("bob"))  # token-2
+    reaper.stop()
+
+    backend = SQLiteStorage()
+    backend.put_many({f"user:{i}": {"id": i} for i in range(10)})
+    loads = []
+
+    def slow_loader(key):
+        loads.append(key)
+        sleep(0.1)
+        return backend.get(key)
+
+    users = LoadingCache(ConcurrentCache(LRU, HashMap, 100, segments=4), backend, slow_loader, flush_size=2)
+    readers = [Thread(target=users.get, args=("user:1",)) for _ in range(5)]
+    [r.start() for r in readers]
+    [r.join() for r in readers]
+    print(f"5 concurrent misses, {len(loads)} backend load(s)")
+    print(users.get_many(["user:1", "user:2", "user:3"]), f"{len(loads)} backend loads in total")
+    users.put("user:42", {"id": 42})
+    users.put("user:43", {"id": 43})  # second buffered write triggers a flush
+    print(backend.get("user:43"))
+
+    blobs = Cache(LRU(), HashMap(), capacity=1 << 20, weigher=size_weigher)  # 1 MiB budget
+    for i in range(8):
+        blobs.put(f"blob:{i}", bytes(200_000))  # each put past the fifth evicts the oldest blob
+    blobs.get("blob:7")
+    blobs.get("blob:0")
+    print(blobs.stats())
+
+    snapshot_path = os.path.join(tempfile.gettempdir(), "cache.snapshot")
+    warm_cache = Cache(LRU(), HashMap(), 3)
+    for key in ("x", "y", "z"):
+        warm_cache.put(key, key.upper())
+    warm_cache.get("x")  # LRU order is now y, z, x
+    warm_cache.snapshot(snapshot_path)
+    restarted = Cache(LRU(), HashMap(), 3)
+    restarted.restore(snapshot_path)
+    restarted.put("w", "W")  # evicts 'y', exactly as the original cache would have
+    print(restarted.get("y"), restarted.get("x"))  # None X
+    restarted.release_snapshot()  # 'z' is copied out and the file unmapped, so it can be deleted
+    os.remove(snapshot_path)
+
+    shared = SharedMemoryStorage(slots=64, value_size=256)
+    worker = Process(target=warm, args=(shared.name, shared.lock))
+    worker.start()
+    worker.join()
+    pages = Cache(LRU(), shared, 32)
+    print(bytes(pages.get("page:2")), shared.size())  # written by the other process, read zero-copy
+    shared.close()
+    shared.unlink()
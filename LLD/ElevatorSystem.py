@@ -9,7 +9,10 @@ Dispatcher Algorithms:
 from abc import ABC, abstractmethod
 from enum import Enum
 from collections import defaultdict
-from threading import Thread, Lock
+from threading import Thread, Lock, Condition
+from bisect import bisect_left, insort
+import heapq
+import random
 import time
 
 class ElevatorState(Enum):
@@ -27,6 +30,39 @@ class Dispatcher(ABC):
     def dispatch_elevator(self, elevator):
         pass
 
+    def assign_elevator(self, system, floor: int, destination: int = None):
+        """Pick the car that answers a hall call: the closest idle car, else the closest car not in maintenance."""
+        return system.idle.nearest(floor) or system.in_service.nearest(floor)
+
+class FloorIndex:
+    """
+    Cars grouped by the floor they are at, plus a sorted list of the occupied floors, so the car nearest a floor is
+    a bisect and a look either side, O(log floors), instead of a scan of the whole fleet. Ties go to the lowest car id.
+    """
+    def __init__(self):
+        self.cars = {}  # floor -> {cars}
+        self.floors = []
+
+    def add(self, car, floor: int):
+        cars = self.cars.get(floor)
+        if cars is None:
+            cars = self.cars[floor] = set()
+            insort(self.floors, floor)
+        cars.add(car)
+
+    def discard(self, car, floor: int):
+        cars = self.cars.get(floor)
+        if cars is not None and car in cars:
+            cars.remove(car)
+            if not cars:
+                del self.cars[floor]
+                del self.floors[bisect_left(self.floors, floor)]
+
+    def nearest(self, floor: int):
+        i = bisect_left(self.floors, floor)
+        candidates = [(abs(f - floor), car.id, car) for f in self.floors[max(i - 1, 0):i + 1] for car in self.cars[f]]
+        return min(candidates, key=lambda c: c[:2])[2] if candidates else None
+
 class Elevator(Thread):
     def __init__(self, id: int, system):
         super().__init__()
@@ -36,7 +72,13 @@ class Elevator(Thread):
         self.state = ElevatorState.IDLE
         self.internal_requests = set()
         self.external_requests = defaultdict(list)
+        # Pending stops: a min-heap of floors at or above the car and a max-heap (negated) of floors below it.
+        # Served or misplaced entries are dropped lazily on peek, so finding the next stop never re-sorts.
+        self.stops = set()
+        self.above = []
+        self.below = []
         self.lock = Lock()
+        self.work = Condition(self.lock)
         self.running = True
     
     def request_elevator(self, floor: int):
@@ -44,70 +86,144 @@ class Elevator(Thread):
             return
         with self.lock:
             self.external_requests[floor].append(Request(floor))
+            self.add_stop(floor)
     
     def select_floor(self, floor: int):
         with self.lock:
             self.internal_requests.add(floor)
+            self.add_stop(floor)
+
+    def add_stop(self, floor: int):
+        if floor not in self.stops:
+            self.stops.add(floor)
+            if floor >= self.current_floor:
+                heapq.heappush(self.above, floor)
+            else:
+                heapq.heappush(self.below, -floor)
+            self.work.notify()
+
+    def next_above(self):
+        """Closest pending stop at or above the car, or None."""
+        while self.above and (self.above[0] not in self.stops or self.above[0] < self.current_floor):
+            floor = heapq.heappop(self.above)
+            if floor in self.stops:
+                heapq.heappush(self.below, -floor)
+        return self.above[0] if self.above else None
+
+    def next_below(self):
+        """Closest pending stop strictly below the car, or None."""
+        while self.below and (-self.below[0] not in self.stops or -self.below[0] >= self.current_floor):
+            floor = -heapq.heappop(self.below)
+            if floor in self.stops:
+                heapq.heappush(self.above, floor)
+        return -self.below[0] if self.below else None
     
+    def next_stop(self):
+        """Ask the dispatcher for the next floor to visit; None leaves the car idle."""
+        if self.state == ElevatorState.MAINTENANCE:
+            self.system.log(f"The Elevator #{self.id} is in Maintenance!")
+            return None
+
+        if not self.stops:
+            self.set_state(ElevatorState.IDLE)
+            return None
+
+        next_floor = self.system.dispatcher.dispatch_elevator(self)
+        if next_floor is None:
+            self.set_state(ElevatorState.IDLE)
+        return next_floor
+
+    def set_state(self, state: ElevatorState):
+        """Change state (including to and from MAINTENANCE) and keep the system's idle/in-service indexes in step."""
+        if state != self.state:
+            previous, self.state = self.state, state
+            self.system.state_changed(self, previous)
+
+    def arrive(self, floor: int):
+        if floor != self.current_floor:
+            previous, self.current_floor = self.current_floor, floor
+            self.system.floor_changed(self, previous)
+        self.stops.discard(floor)
+
+        if floor in self.internal_requests:
+            self.internal_requests.remove(floor)
+            self.system.log(f"Elevator #{self.id} has reached floor #{floor}. Please get down...")
+
+        if floor in self.external_requests:
+            del self.external_requests[floor]
+            self.system.log(f"Ching!!! Elevator #{self.id} has come to floor #{floor}. Please enter...")
+
     def move(self):
         with self.lock:
-            if self.state == ElevatorState.MAINTENANCE:
-                print(f"The Elevator #{self.id} is in Maintenance!")
-                return
-            
-            if not self.internal_requests and not self.external_requests:
-                self.state = ElevatorState.IDLE
-                return
-            
-            next_floor = self.system.dispatcher.dispatch_elevator(self)
-
-            if next_floor is not None:
-                # Simulate travel time
-                time.sleep(abs(self.current_floor - next_floor))
-                self.current_floor = next_floor
-                
-                if next_floor in self.internal_requests:
-                    self.internal_requests.remove(next_floor)
-                    print(f"Elevator #{self.id} has reached floor #{next_floor}. Please get down...")
-                
-                if next_floor in self.external_requests:
-                    del self.external_requests[next_floor]
-                    print(f"Ching!!! Elevator #{self.id} has come to floor #{next_floor}. Please enter...")
-            else:
-                self.state = ElevatorState.IDLE
+            next_floor = self.next_stop()
+        if next_floor is not None:
+            # Simulate travel time without holding the lock, so calls made meanwhile don't block
+            time.sleep(abs(self.current_floor - next_floor))
+            with self.lock:
+                self.arrive(next_floor)
     
     def run(self):
-        while self.running or self.internal_requests or self.external_requests:
+        while True:
+            with self.work:
+                # Park until there is a stop to serve; a car in maintenance parks too
+                while self.running and (not self.stops or self.state == ElevatorState.MAINTENANCE):
+                    self.work.wait()
+                if not self.stops or self.state == ElevatorState.MAINTENANCE:
+                    return
             self.move()
-            # time.sleep(1)
 
     def stop(self):
-        self.running = False
+        with self.work:
+            self.running = False
+            self.work.notify()
 
 class ElevatorSystem:
-    def __init__(self, num_elevators: int, total_floors: int, dispatcher: Dispatcher):
+    def __init__(self, num_elevators: int, total_floors: int, dispatcher: Dispatcher, start: bool = True, log=print):
+        """start=False builds the cars without starting their threads, for the discrete-event Simulation. log=None silences the cars."""
         self.num_elevators = num_elevators
         self.total_floors = total_floors
         self.dispatcher = dispatcher
+        self.log = log or (lambda message: None)
+        # Idle cars and cars in service, by floor, so assigning a hall call doesn't scan every car
+        self.idle = FloorIndex()
+        self.in_service = FloorIndex()
+        self.lock = Lock()
         self.elevators = [Elevator(i, self) for i in range(num_elevators)]
         for elevator in self.elevators:
-            elevator.start()
+            self.idle.add(elevator, elevator.current_floor)
+            self.in_service.add(elevator, elevator.current_floor)
+        if start:
+            for elevator in self.elevators:
+                elevator.start()
 
-    def request_elevator(self, floor: int):
-        """For calling an elevator from the lobby"""
-
-        # Find all idle elevators
-        idle_elevators = [e for e in self.elevators if e.state == ElevatorState.IDLE]
-        
-        if idle_elevators:
-            # Assign the closest idle elevator to the request
-            best_elevator = min(idle_elevators, key=lambda e: abs(e.current_floor - floor))
-        else:
-            # If no idle elevators, assign the closest elevator that is not in maintenance
-            busy_elevators = [e for e in self.elevators if e.state != ElevatorState.MAINTENANCE]
-            best_elevator = min(busy_elevators, key=lambda e: abs(e.current_floor - floor))
-        
+    def request_elevator(self, floor: int, destination: int = None):
+        """For calling an elevator from the lobby; destination-aware dispatchers use the floor keyed in at the panel"""
+        with self.lock:
+            best_elevator = self.dispatcher.assign_elevator(self, floor, destination)
         best_elevator.request_elevator(floor)
+        return best_elevator
+
+    def state_changed(self, elevator: Elevator, previous: ElevatorState):
+        floor = elevator.current_floor
+        with self.lock:
+            if previous == ElevatorState.IDLE:
+                self.idle.discard(elevator, floor)
+            elif elevator.state == ElevatorState.IDLE:
+                self.idle.add(elevator, floor)
+            if previous == ElevatorState.MAINTENANCE:
+                self.in_service.add(elevator, floor)
+            elif elevator.state == ElevatorState.MAINTENANCE:
+                self.in_service.discard(elevator, floor)
+
+    def floor_changed(self, elevator: Elevator, previous: int):
+        floor = elevator.current_floor
+        with self.lock:
+            if elevator.state == ElevatorState.IDLE:
+                self.idle.discard(elevator, previous)
+                self.idle.add(elevator, floor)
+            if elevator.state != ElevatorState.MAINTENANCE:
+                self.in_service.discard(elevator, previous)
+                self.in_service.add(elevator, floor)
     
     def select_floor(self, elevator_id: int, floor: int):
         """For selecting floor from inside the elevator"""
@@ -121,27 +237,173 @@ class ElevatorSystem:
 
 class LOOK(Dispatcher):
     def dispatch_elevator(self, elevator) -> int:
-        target_floors = sorted(elevator.internal_requests | set(elevator.external_requests.keys()))
+        above, below = elevator.next_above(), elevator.next_below()
 
-        if not target_floors:
+        if above is None and below is None:
             return None
         
         if elevator.state == ElevatorState.IDLE:
-            if target_floors[0] > elevator.current_floor:
-                elevator.state = ElevatorState.MOVING_UP
-            elif target_floors[-1] < elevator.current_floor:
-                elevator.state = ElevatorState.MOVING_DOWN
+            if below is None and above > elevator.current_floor:
+                elevator.set_state(ElevatorState.MOVING_UP)
+            elif above is None:
+                elevator.set_state(ElevatorState.MOVING_DOWN)
         
         if elevator.state == ElevatorState.MOVING_UP:
-            next_floor = [f for f in target_floors if f >= elevator.current_floor]
+            return above
+        if above == elevator.current_floor:
+            return above
+        return below
+
+class DestinationDispatch(LOOK):
+    """
+    Destination dispatch: passengers key in their destination at the hall panel, so a car is chosen for the whole trip.
+    Every car is scored by estimated time-to-destination (reach the caller on its current sweep, then ride) plus a
+    penalty per stop it already owes and per stop it would have to add. Passengers sharing an origin and destination
+    add no stops to a car already serving them, so they batch into the same car. Cars still move by LOOK.
+    """
+    def __init__(self, stop_penalty: float = 2.0):
+        self.stop_penalty = stop_penalty
+
+    def assign_elevator(self, system, floor: int, destination: int = None):
+        if destination is None:
+            return super().assign_elevator(system, floor)
+
+        best_elevator, best_cost = None, float("inf")
+        for elevator in system.elevators:
+            if elevator.state == ElevatorState.MAINTENANCE:
+                continue
+            cost = self.time_to_destination(elevator, floor, destination)
+            if cost < best_cost:
+                best_elevator, best_cost = elevator, cost
+        return best_elevator
+
+    def time_to_destination(self, elevator, origin: int, destination: int) -> float:
+        current = elevator.current_floor
+        stops = elevator.stops
+
+        if elevator.state == ElevatorState.MOVING_UP and origin < current:
+            top = max(stops, default=current)
+            pickup = (top - current) + (top - origin)
+        elif elevator.state == ElevatorState.MOVING_DOWN and origin > current:
+            bottom = min(stops, default=current)
+            pickup = (current - bottom) + (origin - bottom)
         else:
-            next_floor = [f for f in reversed(target_floors) if f <= elevator.current_floor]
-        
-        return next_floor[0] if next_floor else None
-
-system = ElevatorSystem(2, 10, LOOK())
-system.request_elevator(1)
-system.request_elevator(3)
-system.select_floor(0, 7)
-system.select_floor(1, 5)
-system.stop_system()
\ No newline at end of file
+            pickup = abs(origin - current)
+
+        new_stops = (origin not in stops) + (destination not in stops)
+        return pickup + abs(destination - origin) + self.stop_penalty * (len(stops) + new_stops)
+
+class Simulation:
+    """
+    Discrete-event simulation of an ElevatorSystem: a virtual clock and an event heap drive the same Elevator and Dispatcher
+    logic with no threads and no sleeps. A car moving between stops is one "arrive" event; an idle car costs nothing.
+    """
+    def __init__(self, num_elevators: int, total_floors: int, dispatcher: Dispatcher, floor_time: float = 1.0, stop_time: float = 0.0):
+        self.system = ElevatorSystem(num_elevators, total_floors, dispatcher, start=False, log=None)
+        self.floor_time = floor_time
+        self.stop_time = stop_time
+        self.clock = 0.0
+        self.events = []
+        self.sequence = 0
+        self.busy = [False] * num_elevators
+        self.waiting = defaultdict(list)  # (car id, floor) -> [(arrival time, destination)]
+        self.riding = defaultdict(list)  # (car id, floor) -> [arrival time]
+        self.wait_times = []
+        self.trip_times = []
+        self.floors_travelled = 0
+
+    def schedule(self, at: float, kind: str, *payload):
+        heapq.heappush(self.events, (at, self.sequence, kind, payload))
+        self.sequence += 1
+
+    def add_passenger(self, at: float, origin: int, destination: int):
+        self.schedule(at, "call", origin, destination)
+
+    def run(self, until: float = float("inf")):
+        handlers = {"call": self.on_call, "arrive": self.on_arrive, "step": self.on_step}
+        while self.events and self.events[0][0] <= until:
+            self.clock, _, kind, payload = heapq.heappop(self.events)
+            handlers[kind](*payload)
+
+    def on_call(self, origin: int, destination: int):
+        car = self.system.request_elevator(origin, destination)
+        self.waiting[(car.id, origin)].append((self.clock, destination))
+        if car.state == ElevatorState.IDLE and car.current_floor == origin and origin not in car.external_requests:
+            self.board(car, origin)
+        self.wake(car)
+
+    def wake(self, car):
+        if not self.busy[car.id]:
+            self.busy[car.id] = True
+            self.schedule(self.clock, "step", car)
+
+    def on_step(self, car):
+        next_floor = car.next_stop()
+        if next_floor is None and car.stops:
+            next_floor = car.next_stop()  # LOOK turns around on the second look
+        if next_floor is None:
+            self.busy[car.id] = False
+            return
+        distance = abs(car.current_floor - next_floor)
+        self.floors_travelled += distance
+        self.schedule(self.clock + distance * self.floor_time, "arrive", car, next_floor)
+
+    def on_arrive(self, car, floor: int):
+        car.arrive(floor)
+        for boarded_at in self.riding.pop((car.id, floor), ()):
+            self.trip_times.append(self.clock - boarded_at)
+        self.board(car, floor)
+        self.schedule(self.clock + self.stop_time, "step", car)
+
+    def board(self, car, floor: int):
+        for arrived_at, destination in self.waiting.pop((car.id, floor), ()):
+            self.wait_times.append(self.clock - arrived_at)
+            if destination == floor:
+                continue
+            self.riding[(car.id, destination)].append(arrived_at)
+            car.select_floor(destination)
+
+    def report(self) -> dict:
+        waits = sorted(self.wait_times)
+        return {
+            "trips": len(self.trip_times),
+            "average_wait": sum(waits) / len(waits) if waits else 0.0,
+            "p95_wait": waits[int(len(waits) * 0.95)] if waits else 0.0,
+            "average_trip": sum(self.trip_times) / len(self.trip_times) if self.trip_times else 0.0,
+            "floors_travelled": self.floors_travelled,
+        }
+
+def simulate_day(dispatcher: Dispatcher, num_elevators: int = 100, total_floors: int = 200, passengers: int = 100_000,
+                 duration: float = 86_400.0, stop_time: float = 0.0, seed: int = 1) -> Simulation:
+    """Uniform random origin/destination traffic over a virtual day."""
+    rng = random.Random(seed)
+    simulation = Simulation(num_elevators, total_floors, dispatcher, stop_time=stop_time)
+    for _ in range(passengers):
+        origin, destination = rng.randrange(total_floors), rng.randrange(total_floors)
+        simulation.add_passenger(rng.uniform(0, duration), origin, destination)
+    simulation.run()
+    return simulation
+
+def benchmark(passengers: int = 100_000):
+    start = time.perf_counter()
+    simulation = simulate_day(LOOK(), passengers=passengers)
+    elapsed = time.perf_counter() - start
+    print(f"[100 cars x 200 floors, {passengers} passengers] simulated a day in {elapsed:.1f}s: {simulation.report()}")
+
+def compare_dispatchers(num_elevators: int = 20, total_floors: int = 60, passengers: int = 50_000, duration: float = 36_000.0):
+    """Same traffic under each dispatcher: wait times and energy (floors travelled), with 3s door stops."""
+    for dispatcher in (LOOK(), DestinationDispatch()):
+        report = simulate_day(dispatcher, num_elevators, total_floors, passengers, duration, stop_time=3.0).report()
+        print(f"[{type(dispatcher).__name__}] average wait {report['average_wait']:.1f}s, p95 wait {report['p95_wait']:.1f}s, "
+              f"average trip {report['average_trip']:.1f}s, floors travelled {report['floors_travelled']}")
+
+if __name__ == "__main__":
+    system = ElevatorSystem(2, 10, LOOK())
+    system.request_elevator(1)
+    system.request_elevator(3)
+    system.select_floor(0, 7)
+    system.select_floor(1, 5)
+    system.stop_system()
+
+    benchmark()
+    compare_dispatchers()
@@ -1,52 +1,369 @@
-import sys
 import os
-sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
-
-from DSA.DLL import DLL
-from uuid import uuid4
 from enum import Enum
-from collections import defaultdict
+from time import perf_counter, time_ns
+from abc import ABC, abstractmethod
+from threading import Lock
+from array import array
+from itertools import count
+from multiprocessing import Process, Queue
+from queue import Empty
+import heapq
+import math
+import pickle
+import zlib
+import tracemalloc
+import tempfile
+import random
+import struct
 
 class Side(Enum):
     buy = "BUY"
     sell = "SELL"
 
 class Order:
-    def __init__(self, side: Side, price: float, quantity: int):
-        self.prev = None
-        self.next = None
-        self.order_id = uuid4()
+    """Read-only view of a resting order, built on demand from the OrderStore."""
+    __slots__ = ("order_id", "side", "price", "quantity")
+
+    def __init__(self, side: Side, price: float, quantity: int, order_id: int):
+        self.order_id = order_id
         self.side = side
         self.price = price
         self.quantity = quantity
 
-class PriceLevel(DLL):
-    def match_order(self, quantity: int) -> int:
+class OrderStore:
+    """
+    Resting orders kept in preallocated parallel arrays, one slot per order.
+    prev/next link slots into their PriceLevel queue (-1 terminates); free slots are chained through next.
+    """
+    def __init__(self, capacity: int = 1024):
+        self.order_ids = array('q')
+        self.quantities = array('q')
+        self.price_indices = array('i')
+        self.sides = array('b')
+        self.prev = array('i')
+        self.next = array('i')
+        self.capacity = 0
+        self.free = -1
+        self.grow(capacity)
+
+    def grow(self, capacity: int):
+        extra = capacity - self.capacity
+        if extra <= 0:
+            return
+        for column in (self.order_ids, self.quantities, self.price_indices, self.sides):
+            column.extend(array(column.typecode, bytes(column.itemsize * extra)))
+        self.prev.extend(array('i', [-1]) * extra)
+        self.next.extend(array('i', range(self.capacity + 1, capacity + 1)))
+        self.next[capacity - 1] = self.free
+        self.free = self.capacity
+        self.capacity = capacity
+
+    def allocate(self, order_id: int, side: int, price_index: int, quantity: int) -> int:
+        if self.free == -1:
+            self.grow(max(self.capacity * 2, 1))
+        slot = self.free
+        self.free = self.next[slot]
+        self.order_ids[slot] = order_id
+        self.sides[slot] = side
+        self.price_indices[slot] = price_index
+        self.quantities[slot] = quantity
+        return slot
+
+    def release(self, slot: int):
+        self.prev[slot] = -1
+        self.next[slot] = self.free
+        self.free = slot
+
+FIBONACCI = 0x9E3779B97F4A7C15
+
+class OrderIndex:
+    """
+    order_id -> store slot, as a linear-probing hash table over one array('i') of slots (-1 is empty).
+    Keys are not stored: a bucket's id is read back from store.order_ids, so an entry costs 4 bytes at
+    load factor <= 1/2 instead of a dict entry plus two boxed ints. Deletion shifts the probe run back, so there are no tombstones.
+    Supports the dict operations OrderBook uses.
+    """
+    def __init__(self, store: OrderStore, capacity: int = 1024):
+        self.store = store
+        self.count = 0
+        self.resize(1 << max(3, (2 * capacity - 1).bit_length()))
+
+    def resize(self, size: int):
+        old = getattr(self, "slots", ())
+        self.mask = size - 1
+        self.shift = 64 - (size.bit_length() - 1)
+        self.slots = array('i', [-1]) * size
+        for slot in old:
+            if slot != -1:
+                self.place(self.store.order_ids[slot], slot)
+
+    # Fibonacci hashing: bits of the product just below bit 64 spread sequential and strided ids alike.
+    # The expression is inlined in each method below because this sits on every place and cancel.
+    def find(self, order_id: int) -> int:
+        """Bucket holding order_id, or -1."""
+        slots, order_ids, mask = self.slots, self.store.order_ids, self.mask
+        i = (order_id * FIBONACCI >> self.shift) & mask
+        while (slot := slots[i]) != -1:
+            if order_ids[slot] == order_id:
+                return i
+            i = (i + 1) & mask
+        return -1
+
+    def place(self, order_id: int, slot: int):
+        slots, mask = self.slots, self.mask
+        i = (order_id * FIBONACCI >> self.shift) & mask
+        while slots[i] != -1:
+            i = (i + 1) & mask
+        slots[i] = slot
+
+    def __len__(self):
+        return self.count
+
+    def __contains__(self, order_id: int) -> bool:
+        return self.find(order_id) != -1
+
+    def __iter__(self):
+        order_ids = self.store.order_ids
+        return (order_ids[slot] for slot in self.slots if slot != -1)
+
+    def get(self, order_id: int, default=None):
+        i = self.find(order_id)
+        return default if i == -1 else self.slots[i]
+
+    def __setitem__(self, order_id: int, slot: int):
+        """The store must already hold order_id at slot. Ids are unique; OrderBook checks before resting."""
+        self.count += 1
+        if 2 * self.count > len(self.slots):
+            self.resize(2 * len(self.slots))
+        self.place(order_id, slot)
+
+    def pop(self, order_id: int, default=None):
+        i = self.find(order_id)
+        if i == -1:
+            return default
+        slots, order_ids, mask, shift = self.slots, self.store.order_ids, self.mask, self.shift
+        slot = slots[i]
+        # Backward-shift deletion: pull later entries of the probe run into the hole unless they sit at their home bucket or beyond it
+        hole, j = i, (i + 1) & mask
+        while (moved := slots[j]) != -1:
+            home = (order_ids[moved] * FIBONACCI >> shift) & mask
+            if (j - home) & mask >= (j - hole) & mask:
+                slots[hole] = moved
+                hole = j
+            j = (j + 1) & mask
+        slots[hole] = -1
+        self.count -= 1
+        return slot
+
+    def __delitem__(self, order_id: int):
+        if self.pop(order_id, -1) == -1:
+            raise KeyError(order_id)
+
+class ExecutionListener(ABC):
+    @abstractmethod
+    def on_trade(self, maker_id, taker_id, price: float, quantity: int, timestamp: int):
+        """Called once per fill against a resting (maker) order. timestamp is in ns since the epoch."""
+        pass
+
+class NullExecutionListener(ExecutionListener):
+    def on_trade(self, maker_id, taker_id, price, quantity, timestamp):
+        pass
+
+class RingBufferSink(ExecutionListener):
+    """
+    Bounded buffer of trade tuples (maker_id, taker_id, price, quantity, timestamp).
+    When full, the oldest trade is overwritten and counted in dropped; a consumer calls drain() to take everything at once.
+    """
+    def __init__(self, capacity: int = 65536):
+        self.capacity = capacity
+        self.buffer = [None] * capacity
+        self.start = 0
+        self.count = 0
+        self.dropped = 0
+        self.lock = Lock()
+
+    def on_trade(self, maker_id, taker_id, price, quantity, timestamp):
+        with self.lock:
+            end = (self.start + self.count) % self.capacity
+            self.buffer[end] = (maker_id, taker_id, price, quantity, timestamp)
+            if self.count == self.capacity:
+                self.start = (self.start + 1) % self.capacity
+                self.dropped += 1
+            else:
+                self.count += 1
+
+    def drain(self) -> list:
+        with self.lock:
+            end = self.start + self.count
+            if end <= self.capacity:
+                trades = self.buffer[self.start:end]
+            else:
+                trades = self.buffer[self.start:] + self.buffer[:end - self.capacity]
+            self.start = self.count = 0
+            return trades
+
+class PriceLevel:
+    """FIFO queue of OrderStore slots at one price, linked through the store's prev/next arrays. volume is the resting total."""
+    __slots__ = ("store", "head", "tail", "volume")
+
+    def __init__(self, store: OrderStore):
+        self.store = store
+        self.head = -1
+        self.tail = -1
+        self.volume = 0
+
+    def is_empty(self) -> bool:
+        return self.head == -1
+
+    def append(self, slot: int):
+        store = self.store
+        store.prev[slot] = self.tail
+        store.next[slot] = -1
+        if self.tail == -1:
+            self.head = slot
+        else:
+            store.next[self.tail] = slot
+        self.tail = slot
+        self.volume += store.quantities[slot]
+
+    def remove(self, slot: int):
+        store = self.store
+        prev, next = store.prev[slot], store.next[slot]
+        if prev == -1:
+            self.head = next
+        else:
+            store.next[prev] = next
+        if next == -1:
+            self.tail = prev
+        else:
+            store.prev[next] = prev
+        self.volume -= store.quantities[slot]
+
+    def match_order(self, quantity: int, price: float, orders: "OrderIndex", taker_id: int,
+                    listener: ExecutionListener, timestamp: int) -> int:
+        """Fill up to quantity from the head of the queue, reporting each fill to listener. Fully filled orders are released."""
+        store = self.store
+        quantities, order_ids, next = store.quantities, store.order_ids, store.next
         total_trade_quantity = 0
-        while quantity > 0 and self.head:
-            order = self.head
-            trade_quantity = min(quantity, order.quantity)
+        while quantity > 0 and self.head != -1:
+            slot = self.head
+            resting = quantities[slot]
+            trade_quantity = min(quantity, resting)
             total_trade_quantity += trade_quantity
             quantity -= trade_quantity
-            if order.quantity == trade_quantity:
-                print(f"Order {order.order_id}: {order.side} has been executed @ {order.price}.")
-                self.pop_left()
+            maker_id = order_ids[slot]
+            listener.on_trade(maker_id, taker_id, price, trade_quantity, timestamp)
+            if resting == trade_quantity:
+                self.head = next[slot]
+                if self.head == -1:
+                    self.tail = -1
+                else:
+                    store.prev[self.head] = -1
+                del orders[maker_id]
+                store.release(slot)
             else:
-                order.quantity -= trade_quantity 
+                quantities[slot] = resting - trade_quantity
+        self.volume -= total_trade_quantity
         return total_trade_quantity
 
+class TickBitmap:
+    """
+    Hierarchical occupancy bitmap over the tick ladder.
+    Each layer packs 64 flags per word; a set bit in layer k+1 means the word below is non-empty,
+    so set/clear/min/max all cost O(log64(size)) instead of a scan over every price level.
+    """
+    def __init__(self, size: int):
+        self.layers = []
+        while True:
+            words = (size + 63) >> 6
+            self.layers.append([0] * words)
+            if words == 1:
+                break
+            size = words
+
+    def set(self, i: int):
+        for layer in self.layers:
+            w, b = i >> 6, i & 63
+            empty = layer[w] == 0
+            layer[w] |= 1 << b
+            if not empty:
+                return
+            i = w
+
+    def clear(self, i: int):
+        for layer in self.layers:
+            w, b = i >> 6, i & 63
+            layer[w] &= ~(1 << b)
+            if layer[w]:
+                return
+            i = w
+
+    def max(self):
+        top = self.layers[-1][0]
+        if not top:
+            return None
+        i = top.bit_length() - 1
+        for layer in reversed(self.layers[:-1]):
+            i = (i << 6) | (layer[i].bit_length() - 1)
+        return i
+
+    def min(self):
+        top = self.layers[-1][0]
+        if not top:
+            return None
+        i = (top & -top).bit_length() - 1
+        for layer in reversed(self.layers[:-1]):
+            word = layer[i]
+            i = (i << 6) | ((word & -word).bit_length() - 1)
+        return i
+
+    def prev_set(self, i: int):
+        """Largest set index below i, or None."""
+        for depth, layer in enumerate(self.layers):
+            w, b = i >> 6, i & 63
+            word = layer[w] & ((1 << b) - 1)
+            if word:
+                i = (w << 6) | (word.bit_length() - 1)
+                for lower in reversed(self.layers[:depth]):
+                    i = (i << 6) | (lower[i].bit_length() - 1)
+                return i
+            i = w
+        return None
+
+    def next_set(self, i: int):
+        """Smallest set index above i, or None."""
+        for depth, layer in enumerate(self.layers):
+            w, b = i >> 6, i & 63
+            word = layer[w] >> (b + 1) << (b + 1)
+            if word:
+                i = (w << 6) | ((word & -word).bit_length() - 1)
+                for lower in reversed(self.layers[:depth]):
+                    word = lower[i]
+                    i = (i << 6) | ((word & -word).bit_length() - 1)
+                return i
+            i = w
+        return None
+
 class OrderBook:
-    def __init__(self, price_min: float, price_max: float, tick_size: float):
+    SIDES = (Side.buy, Side.sell)
+
+    def __init__(self, price_min: float, price_max: float, tick_size: float, listener: ExecutionListener = None,
+                 capacity: int = 1024):
+        self.listener = listener or NullExecutionListener()
         self.price_min = price_min
         self.price_max = price_max
         self.tick_size = tick_size
         self.size = int((price_max - price_min) / tick_size) + 1
-        self.bids = [PriceLevel() for _ in range(self.size)]
-        self.asks = [PriceLevel() for _ in range(self.size)]
+        self.store = OrderStore(capacity)
+        self.bids = [PriceLevel(self.store) for _ in range(self.size)]
+        self.asks = [PriceLevel(self.store) for _ in range(self.size)]
+        self.bid_levels = TickBitmap(self.size)
+        self.ask_levels = TickBitmap(self.size)
         self.best_bid = None
         self.best_ask = None
-        self.volumes = defaultdict(int)
-        self.orders = {}
+        self.changed = (set(), set())  # tick indices touched since the last deltas(), per side
+        self.orders = OrderIndex(self.store, capacity)  # order_id -> store slot
+        self.order_ids = count()
     
     def price_to_index(self, price: float) -> int:
         return int((price - self.price_min) / self.tick_size)
@@ -56,86 +373,500 @@ class OrderBook:
     
     def update_best_price(self, side:Side):
         if side == Side.buy:
-            for i in reversed(range(self.size)):
-                if not self.bids[i].is_empty():
-                    self.best_bid = i
-                    return
-            self.best_bid = None
+            self.best_bid = self.bid_levels.max()
         else:
-            for i in range(self.size):
-                if not self.asks[i].is_empty():
-                    self.best_ask = i
-                    return
-            self.best_ask = None
+            self.best_ask = self.ask_levels.min()
 
-    def place_order(self, price: float, quantity: int, side: Side):
+    def place_order(self, price: float, quantity: int, side: Side, order_id: int = None):
+        """Match and rest an order. Without order_id, ids are drawn from a per-book counter."""
         if price < self.price_min or price > self.price_max:
             raise ValueError(f"Price {price} is out of range. Must be between {self.price_min} and {self.price_max}.")
         
         index = self.price_to_index(price)
-        initial_quantity = quantity
-        self.volumes[(side, price)] += quantity
+        if order_id is None:
+            order_id = next(self.order_ids)
+        if order_id in self.orders:
+            raise ValueError(f"Order id {order_id} is already resting.")
+        remaining = self.match(index, quantity, side, order_id)
+        if remaining:
+            self.rest(index, remaining, side, order_id)
+        if remaining == quantity:
+            return order_id
+        return None
+
+    def match(self, index: int, quantity: int, side: Side, taker_id: int = None) -> int:
+        """Cross an incoming order against the opposite side. Returns the unfilled quantity."""
+        listener, timestamp = self.listener, time_ns()
         if side == Side.buy:
             while self.best_ask is not None and self.best_ask <= index and quantity > 0:
                 best_sell = self.asks[self.best_ask]
-                matched = best_sell.match_order(quantity)
-                quantity -= matched
+                price = self.index_to_price(self.best_ask)
+                quantity -= best_sell.match_order(quantity, price, self.orders, taker_id, listener, timestamp)
+                self.changed[1].add(self.best_ask)
                 if best_sell.is_empty():
-                    self.update_best_price(side)
-
-            if quantity:
-                order = Order(side, price, quantity)
-                self.orders[order.order_id] = (order, index)
-                self.bids[index].append(order)
-                if self.best_bid is None or index > self.best_bid:
-                    self.best_bid = index
+                    self.ask_levels.clear(self.best_ask)
+                    self.update_best_price(Side.sell)
         else:
             while self.best_bid is not None and self.best_bid >= index and quantity > 0:
                 best_buy = self.bids[self.best_bid]
-                matched = best_buy.match_order(quantity)
-                quantity -= matched
+                price = self.index_to_price(self.best_bid)
+                quantity -= best_buy.match_order(quantity, price, self.orders, taker_id, listener, timestamp)
+                self.changed[0].add(self.best_bid)
                 if best_buy.is_empty():
-                    self.update_best_price(side)
-
-            if quantity:
-                order = Order(side, price, quantity)
-                self.orders[order.order_id] = (order, index)
-                self.asks[index].append(order)
-                if self.best_ask is None or index > self.best_ask:
-                    self.best_ask = index
-        if quantity == 0:
-            print(f"{side} has been executed @ {price} for {initial_quantity} shares.")
-        elif initial_quantity == quantity:
-            return order.order_id
-        return None
+                    self.bid_levels.clear(self.best_bid)
+                    self.update_best_price(Side.buy)
+        return quantity
 
-    def cancel_order(self, order_id):
-        if order_id not in self.orders:
-            print(f"Order {order_id} not found!")
-            return
+    def rest(self, index: int, quantity: int, side: Side, order_id: int) -> int:
+        slot = self.store.allocate(order_id, side is Side.sell, index, quantity)
+        self.orders[order_id] = slot
+        self.link(slot, index, side)
+        return slot
+
+    def link(self, slot: int, index: int, side: Side):
+        """Queue slot at the back of its level and raise the touch if it improves on it."""
+        self.changed[side is Side.sell].add(index)
+        if side == Side.buy:
+            self.bids[index].append(slot)
+            self.bid_levels.set(index)
+            if self.best_bid is None or index > self.best_bid:
+                self.best_bid = index
+        else:
+            self.asks[index].append(slot)
+            self.ask_levels.set(index)
+            if self.best_ask is None or index < self.best_ask:
+                self.best_ask = index
+
+    def unlink(self, slot: int, index: int, side: Side):
+        """Take slot out of its level, recomputing the touch if its level emptied."""
+        book, levels = (self.bids, self.bid_levels) if side == Side.buy else (self.asks, self.ask_levels)
+        book[index].remove(slot)
+        self.changed[side is Side.sell].add(index)
+        if book[index].is_empty():
+            levels.clear(index)
+            if (side == Side.buy and index == self.best_bid) or (side == Side.sell and index == self.best_ask):
+                self.update_best_price(side)
+
+    def cancel_order(self, order_id: int) -> bool:
+        slot = self.orders.pop(order_id, None)
+        if slot is None:
+            return False
         
-        order, index = self.orders.pop(order_id)
-        book = self.bids if order.side == Side.buy else self.asks
-        book[index].remove(order)
-        self.volumes[(order.side, order.price)] -= order.quantity
+        store = self.store
+        self.unlink(slot, store.price_indices[slot], self.SIDES[store.sides[slot]])
+        store.release(slot)
+        return True
+
+    def modify_order(self, order_id: int, new_quantity: int, new_price: float = None):
+        """
+        Amend a resting order in place. A quantity reduction at the same price keeps queue priority in O(1);
+        a size increase or price change relinks the same slot at the back of the target level, matching first if it crosses.
+        Returns the quantity filled by the amendment, or None if the order is not resting.
+        """
+        slot = self.orders.get(order_id)
+        if slot is None:
+            return None
+        if new_quantity <= 0:
+            self.cancel_order(order_id)
+            return 0
 
-        if (order.side == Side.buy and index == self.best_bid) or (order.side == Side.sell and index == self.best_ask):
-            self.update_best_price(order.side)
-        print(f"Order {order_id} has been cancelled.")
+        store = self.store
+        side, index = self.SIDES[store.sides[slot]], store.price_indices[slot]
+        new_index = index
+        if new_price is not None:
+            if not self.price_min <= new_price <= self.price_max:
+                raise ValueError(f"Price {new_price} is out of range. Must be between {self.price_min} and {self.price_max}.")
+            new_index = self.price_to_index(new_price)
+
+        quantity = store.quantities[slot]
+        if new_index == index and new_quantity <= quantity:
+            level = self.bids[index] if side == Side.buy else self.asks[index]
+            level.volume -= quantity - new_quantity
+            store.quantities[slot] = new_quantity
+            self.changed[side is Side.sell].add(index)
+            return 0
+
+        self.unlink(slot, index, side)
+        remaining = new_quantity if new_index == index else self.match(new_index, new_quantity, side, order_id)
+        if remaining:
+            store.quantities[slot] = remaining
+            store.price_indices[slot] = new_index
+            self.link(slot, new_index, side)
+        else:
+            del self.orders[order_id]
+            store.release(slot)
+        return new_quantity - remaining
+
+    def get_order(self, order_id: int) -> Order:
+        slot = self.orders.get(order_id)
+        if slot is None:
+            return None
+        store = self.store
+        index = store.price_indices[slot]
+        return Order(self.SIDES[store.sides[slot]], self.index_to_price(index), store.quantities[slot], order_id)
 
     def get_volume_at_price(self, price: float, side: Side) -> int:
-        return self.volumes.get((side, price), 0)
+        if price < self.price_min or price > self.price_max:
+            return 0
+        book = self.bids if side == Side.buy else self.asks
+        return book[self.price_to_index(price)].volume
+
+    def depth(self, n: int):
+        """Top n (price, volume) levels per side, best first, walked through the occupancy bitmaps."""
+        bids, asks = [], []
+        i = self.best_bid
+        while i is not None and len(bids) < n:
+            bids.append((self.index_to_price(i), self.bids[i].volume))
+            i = self.bid_levels.prev_set(i)
+        i = self.best_ask
+        while i is not None and len(asks) < n:
+            asks.append((self.index_to_price(i), self.asks[i].volume))
+            i = self.ask_levels.next_set(i)
+        return bids, asks
+
+    def deltas(self) -> list:
+        """
+        (side, price, volume) for every level touched since the previous call, volume 0 meaning the level emptied.
+        Costs time proportional to the number of changed levels, not the size of the book.
+        """
+        updates = []
+        for side, book, changed in zip(self.SIDES, (self.bids, self.asks), self.changed):
+            updates.extend((side, self.index_to_price(i), book[i].volume) for i in sorted(changed))
+            changed.clear()
+        return updates
+
+    def apply(self, kind: int, order_id: int, side: int, price: float, quantity: int) -> int:
+        """Apply one encoded EventBatch event. Returns the quantity filled."""
+        if kind == EventBatch.CANCEL:
+            self.cancel_order(order_id)
+            return 0
+        if kind == EventBatch.MODIFY:
+            return self.modify_order(order_id, quantity, None if math.isnan(price) else price) or 0
+        if not self.price_min <= price <= self.price_max:  # also rejects a NaN price
+            raise ValueError(f"Price {price} is out of range. Must be between {self.price_min} and {self.price_max}.")
+        if order_id in self.orders:
+            raise ValueError(f"Order id {order_id} is already resting.")
+        side = self.SIDES[side]
+        index = self.price_to_index(price)
+        remaining = self.match(index, quantity, side, order_id)
+        if remaining:
+            self.rest(index, remaining, side, order_id)
+        return quantity - remaining
+
+    def process_batch(self, batch: "EventBatch", log: "EventLog" = None) -> array:
+        """
+        Apply a columnar batch of add/cancel/modify events in order.
+        Order ids come from the batch, so a logged batch replays to the same book.
+        Returns the filled quantity per event as an array('q').
+        """
+        if log is not None:
+            log.append(batch)
+        apply = self.apply
+        columns = zip(batch.kinds, batch.order_ids, batch.sides, batch.prices, batch.quantities)
+        return array('q', [apply(*event) for event in columns])
+
+class EventBatch:
+    """Columnar add/cancel/modify events. Sides are encoded 0 = buy, 1 = sell; a MODIFY priced KEEP_PRICE keeps its price."""
+    ADD, CANCEL, MODIFY = 0, 1, 2
+    KEEP_PRICE = math.nan
+    COLUMNS = (("kinds", 'b'), ("order_ids", 'q'), ("sides", 'b'), ("prices", 'd'), ("quantities", 'q'))
+
+    def __init__(self):
+        for name, typecode in self.COLUMNS:
+            setattr(self, name, array(typecode))
+
+    def __len__(self):
+        return len(self.kinds)
+
+    def add(self, kind: int, order_id: int, side: int = 0, price: float = None, quantity: int = 0):
+        self.kinds.append(kind)
+        self.order_ids.append(order_id)
+        self.sides.append(side)
+        self.prices.append(self.KEEP_PRICE if price is None else price)
+        self.quantities.append(quantity)
+
+class EventLog:
+    """
+    Append-only binary log of EventBatch records: a little-endian u32 event count followed by each column's raw bytes.
+    Columns are written in native byte order, so a log replays on machines of the same endianness.
+    """
+    HEADER = struct.Struct('<I')
+
+    def __init__(self, path: str):
+        self.path = path
+        self.file = open(path, 'ab')
+
+    def append(self, batch: EventBatch):
+        self.file.write(self.HEADER.pack(len(batch)))
+        for name, _ in EventBatch.COLUMNS:
+            getattr(batch, name).tofile(self.file)
+
+    def flush(self):
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+    def batches(self):
+        if not self.file.closed:
+            self.flush()
+        with open(self.path, 'rb') as f:
+            while header := f.read(self.HEADER.size):
+                (count,) = self.HEADER.unpack(header)
+                batch = EventBatch()
+                for name, _ in EventBatch.COLUMNS:
+                    column = getattr(batch, name)
+                    column.fromfile(f, count)
+                yield batch
+
+    def replay(self, book: OrderBook) -> int:
+        """Re-apply every logged batch to book. Returns the number of events replayed."""
+        events = 0
+        for batch in self.batches():
+            book.process_batch(batch)
+            events += len(batch)
+        return events
+
+class SequencedSink(ExecutionListener):
+    """Collects trades tagged with the engine sequence number of the event that caused them."""
+    def __init__(self):
+        self.seq = 0
+        self.trades = []
+
+    def on_trade(self, maker_id, taker_id, price, quantity, timestamp):
+        self.trades.append((self.seq, maker_id, taker_id, price, quantity, timestamp))
+
+def run_shard(instruments: dict, symbols: list, inbox: Queue, outbox: Queue):
+    """
+    Shard process loop: owns the books for its symbols and answers each batch with its fills, trades and errors.
+    A rejected event fills 0 and is reported as (seq, exception) instead of killing the shard.
+    """
+    sink = SequencedSink()
+    books = {symbol: OrderBook(*instruments[symbol], listener=sink) for symbol in symbols}
+    names = list(instruments)
+    while (message := inbox.get()) is not None:
+        batch_id, seqs, symbol_ids, batch = message
+        fills = array('q')
+        errors = []
+        columns = zip(seqs, symbol_ids, batch.kinds, batch.order_ids, batch.sides, batch.prices, batch.quantities)
+        for seq, symbol_id, *event in columns:
+            sink.seq = seq
+            try:
+                fills.append(books[names[symbol_id]].apply(*event))
+            except Exception as e:
+                fills.append(0)
+                errors.append((seq, picklable(e)))
+        outbox.put((batch_id, seqs, fills, sink.trades, errors))
+        sink.trades = []
+
+def picklable(error: Exception) -> Exception:
+    """The error itself if it can cross the process boundary, else a RuntimeError carrying its repr."""
+    try:
+        pickle.dumps(error)
+        return error
+    except Exception:
+        return RuntimeError(repr(error))
+
+class RejectedEvents(ValueError):
+    """
+    Raised by MatchingEngine.collect when shards rejected events. errors is [(seq, exception)]; fills and trades are
+    what collect would have returned, since the shards applied every other event in the window.
+    """
+    def __init__(self, errors: list, fills: list, trades: list):
+        seq, error = errors[0]
+        super().__init__(f"{len(errors)} event(s) rejected, first at seq {seq}: {error!r}")
+        self.errors = errors
+        self.fills = fills
+        self.trades = trades
+
+class MatchingEngine:
+    """
+    Owns one OrderBook per symbol, sharded across worker processes by a stable hash of the symbol.
+    Every event gets a global sequence number; a symbol always lives on one shard, so its events are matched in submit order.
+    """
+    def __init__(self, instruments: dict, num_shards: int = None):
+        """instruments maps symbol -> (price_min, price_max, tick_size)."""
+        self.num_shards = num_shards or os.cpu_count()
+        self.symbol_ids = {symbol: i for i, symbol in enumerate(instruments)}
+        self.shard_of = {symbol: zlib.crc32(symbol.encode()) % self.num_shards for symbol in instruments}
+        self.inboxes = [Queue() for _ in range(self.num_shards)]
+        self.outbox = Queue()
+        self.shards = []
+        for shard, inbox in enumerate(self.inboxes):
+            symbols = [symbol for symbol in instruments if self.shard_of[symbol] == shard]
+            process = Process(target=run_shard, args=(instruments, symbols, inbox, self.outbox), daemon=True)
+            process.start()
+            self.shards.append(process)
+        self.seq = count()
+        self.batch_ids = count()
+        self.in_flight = 0
+        self.pending = [self.new_batch() for _ in range(self.num_shards)]
+
+    @staticmethod
+    def new_batch():
+        return array('q'), array('i'), EventBatch()
+
+    def submit(self, symbol: str, kind: int, order_id: int, side: int = 0, price: float = 0.0, quantity: int = 0) -> int:
+        """Queue an EventBatch-encoded event for symbol. Returns its sequence number."""
+        seq = next(self.seq)
+        seqs, symbol_ids, batch = self.pending[self.shard_of[symbol]]
+        seqs.append(seq)
+        symbol_ids.append(self.symbol_ids[symbol])
+        batch.add(kind, order_id, side, price, quantity)
+        return seq
+
+    def flush(self):
+        """Ship every non-empty pending batch to its shard, one message per shard."""
+        for shard, pending in enumerate(self.pending):
+            if len(pending[2]):
+                self.inboxes[shard].put((next(self.batch_ids), *pending))
+                self.pending[shard] = self.new_batch()
+                self.in_flight += 1
+
+    def collect(self):
+        """
+        Flush, then wait for every outstanding batch.
+        Returns (fills, trades): fills is [(seq, filled quantity)] and trades is
+        [(seq, maker_id, taker_id, price, quantity, timestamp)], both in global sequence order.
+        If any event was rejected, raises RejectedEvents once every batch is in, carrying the errors together with the
+        fills and trades of the events the shards did apply. Raises RuntimeError if a shard has died.
+        """
+        self.flush()
+        results = []
+        while self.in_flight:
+            try:
+                results.append(self.outbox.get(timeout=1.0))
+            except Empty:
+                for shard, process in enumerate(self.shards):
+                    if not process.is_alive():
+                        raise RuntimeError(f"Shard {shard} exited with code {process.exitcode}")
+                continue
+            self.in_flight -= 1
+        results.sort(key=lambda result: result[0])
+        errors = sorted((error for *_, errors in results for error in errors), key=lambda error: error[0])
+        fills = list(heapq.merge(*(zip(seqs, filled) for _, seqs, filled, _, _ in results)))
+        trades = list(heapq.merge(*(trades for _, _, _, trades, _ in results)))
+        if errors:
+            raise RejectedEvents(errors, fills, trades)
+        return fills, trades
+
+    def shutdown(self):
+        try:
+            self.collect()
+        finally:
+            for inbox in self.inboxes:
+                inbox.put(None)
+            for process in self.shards:
+                process.join()
+
+def benchmark(ticks: int = 100_000, n: int = 50_000):
+    """Rest n orders on each side of a wide ladder, then cancel them all in random order."""
+    ob = OrderBook(price_min=0.0, price_max=(ticks - 1) * 0.01, tick_size=0.01)
+    mid = ticks // 2
+    prices = [(round(random.randrange(0, mid) * 0.01, 2), Side.buy) for _ in range(n)]
+    prices += [(round(random.randrange(mid, ticks) * 0.01, 2), Side.sell) for _ in range(n)]
+
+    start = perf_counter()
+    ids = [ob.place_order(price, 1, side) for price, side in prices]
+    placed = perf_counter()
+    random.shuffle(ids)
+    for order_id in ids:
+        ob.cancel_order(order_id)
+    cancelled = perf_counter()
+
+    print(f"[{ticks} ticks] place: {2 * n / (placed - start):,.0f} ops/s, cancel: {2 * n / (cancelled - placed):,.0f} ops/s")
+
+def benchmark_batch(ticks: int = 10_000, n: int = 200_000):
+    """Process a random add/cancel/modify stream as one logged batch, then replay the log into a fresh book."""
+    batch, live = EventBatch(), []
+    for order_id in range(n):
+        if live and random.random() < 0.3:
+            victim = live.pop(random.randrange(len(live)))
+            batch.add(random.choice((EventBatch.CANCEL, EventBatch.MODIFY)), victim, victim & 1, random.randrange(ticks) * 0.01, 5)
+        else:
+            batch.add(EventBatch.ADD, order_id, order_id & 1, random.randrange(ticks) * 0.01, random.randint(1, 10))
+            live.append(order_id)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        log = EventLog(os.path.join(tmp, "events.bin"))
+        ob = OrderBook(price_min=0.0, price_max=(ticks - 1) * 0.01, tick_size=0.01)
+        start = perf_counter()
+        ob.process_batch(batch, log)
+        processed = perf_counter()
+        replayed_book = OrderBook(price_min=0.0, price_max=(ticks - 1) * 0.01, tick_size=0.01)
+        log.replay(replayed_book)
+        replayed = perf_counter()
+        log.close()
+
+    assert (ob.best_bid, ob.best_ask, set(ob.orders)) == (replayed_book.best_bid, replayed_book.best_ask, set(replayed_book.orders))
+    print(f"[batch of {n}] process: {n / (processed - start):,.0f} events/s, replay: {n / (replayed - processed):,.0f} events/s")
+
+def benchmark_memory(n: int = 50_000):
+    """Report the traced heap cost per resting order."""
+    tracemalloc.start()
+    ob = OrderBook(price_min=0.0, price_max=99.99, tick_size=0.01)
+    baseline = tracemalloc.get_traced_memory()[0]
+    for _ in range(n):
+        ob.place_order(random.randrange(5000) * 0.01, 10, Side.buy)
+    used = tracemalloc.get_traced_memory()[0] - baseline
+    tracemalloc.stop()
+    print(f"[{n} resting orders] {used / n:.0f} bytes/order")
+
+def benchmark_engine(symbols: int = 64, n: int = 200_000, num_shards: int = None):
+    """Stream random adds and cancels across many symbols through a sharded MatchingEngine."""
+    instruments = {f"SYM{i}": (0.0, 99.99, 0.01) for i in range(symbols)}
+    names = list(instruments)
+    engine = MatchingEngine(instruments, num_shards)
+    start = perf_counter()
+    for order_id in range(n):
+        symbol = names[order_id % symbols]
+        if order_id >= symbols and random.random() < 0.2:
+            engine.submit(symbol, EventBatch.CANCEL, order_id - symbols)
+        else:
+            engine.submit(symbol, EventBatch.ADD, order_id, order_id & 1, random.randrange(4000, 6000) * 0.01, 10)
+        if order_id % 10_000 == 9_999:
+            engine.flush()
+    fills, _ = engine.collect()
+    elapsed = perf_counter() - start
+    engine.shutdown()
+    assert len(fills) == n
+    print(f"[{symbols} symbols, {engine.num_shards} shards] {n / elapsed:,.0f} events/s")
 
 # Example Usage
-ob = OrderBook(price_min=100.0, price_max=110.0, tick_size=0.5)
+if __name__ == "__main__":
+    fills = RingBufferSink()
+    ob = OrderBook(price_min=100.0, price_max=110.0, tick_size=0.5, listener=fills)
+
+    ob.place_order(101.0, 10, Side.buy)
+    order = ob.place_order(101.0, 5, Side.buy)
+    ob.place_order(103.0, 15, Side.sell)
+    ob.place_order(100.5, 8, Side.sell)
+
+    ob.cancel_order(order)
+    amended = ob.place_order(104.0, 20, Side.sell)
+    ob.modify_order(amended, 12)  # smaller size, keeps its place in the queue
+    ob.modify_order(amended, 12, 103.0)  # new price, joins the back of 103.0
+
+    for maker_id, taker_id, price, quantity, _ in fills.drain():
+        print(f"Order {taker_id} traded {quantity} @ {price} against {maker_id}.")
 
-ob.place_order(101.0, 10, Side.buy)
-order = ob.place_order(101.0, 5, Side.buy)
-ob.place_order(103.0, 15, Side.sell)
-ob.place_order(100.5, 8, Side.sell)
+    print("\nVolume at 101.0 (buy):", ob.get_volume_at_price(101.0, Side.buy))
+    print("Best Bid Index:", ob.best_bid)
+    print("Best Ask Index:", ob.best_ask)
+    print("Depth:", ob.depth(5))
+    print("Deltas:", [(side.value, price, volume) for side, price, volume in ob.deltas()])
 
-ob.cancel_order(order)
+    benchmark()
+    benchmark_batch()
+    benchmark_memory()
 
-print("\nVolume at 101.0 (buy):", ob.get_volume_at_price(101.0, Side.buy))
-print("Best Bid Index:", ob.best_bid)
-print("Best Ask Index:", ob.best_ask)
+    engine = MatchingEngine({"AAPL": (100.0, 110.0, 0.5), "MSFT": (300.0, 310.0, 0.5)}, num_shards=2)
+    engine.submit("AAPL", EventBatch.ADD, 1, 0, 101.0, 10)
+    engine.submit("MSFT", EventBatch.ADD, 2, 1, 305.0, 4)
+    engine.submit("AAPL", EventBatch.ADD, 3, 1, 100.5, 6)
+    engine.submit("MSFT", EventBatch.ADD, 4, 0, 305.5, 4)
+    _, trades = engine.collect()
+    for seq, maker_id, taker_id, price, quantity, _ in trades:
+        print(f"#{seq}: order {taker_id} traded {quantity} @ {price} against {maker_id}.")
+    engine.shutdown()
+    benchmark_engine()
@@ -2,7 +2,13 @@ from typing import List, Dict
 from datetime import datetime, timezone
 from uuid import uuid4
 from enum import Enum
-from time import sleep
+from time import sleep, perf_counter
+from collections import defaultdict
+from threading import Lock, Thread
+from bisect import bisect_left, insort
+import heapq
+import random
+import sys
 
 class Status(Enum):
     OCCUPIED = 1
@@ -10,16 +16,18 @@ class Status(Enum):
     MAINTENANCE = -1
 
 class Spot:
-    def __init__(self, id: str, type: str):
+    def __init__(self, id: str, type: str, distance: float = 0):
         self.id = id
         self.type = type
+        self.distance = distance  # from the entrance, used when the garage hands out the nearest spot first
         self.status = Status.AVAILABLE
 
 class Reservation:
-    def __init__(self, vehicle_registration: str, spot: Spot, start_time: datetime):
+    def __init__(self, vehicle_registration: str, spot: Spot, start_time: datetime, garage_id: int = None):
         self.id = str(uuid4())
         self.vehicle_registration = vehicle_registration
         self.spot = spot
+        self.garage_id = garage_id
         self.start_time = start_time
         self.end_time = None
         self.paid = False
@@ -31,18 +39,64 @@ class Reservation:
         self.paid = True
 
 class SpotManager:
-    def __init__(self, spots: List[Spot]):
+    """
+    Free spots are kept in a pool per type, so arrivals and checkouts never scan the garage: a stack gives O(1)
+    allocate/release, or with nearest_first=True a heap keyed on distance gives the closest free spot in O(log n).
+    One lock guards the pools so several gates can allocate concurrently. Change a spot's status through
+    set_status() to keep the pools in sync; entries whose spot is no longer AVAILABLE are skipped when popped.
+    """
+    def __init__(self, spots: List[Spot], nearest_first: bool = False):
         self.spots = spots
+        self.nearest_first = nearest_first
+        self.free = defaultdict(list)
+        self.counts = defaultdict(int)  # type -> AVAILABLE spots
+        self.lock = Lock()
+        for spot in reversed(spots):
+            if spot.status == Status.AVAILABLE:
+                self.free[spot.type].append((spot.distance, spot.id, spot) if nearest_first else spot)
+                self.counts[spot.type] += 1
+        if nearest_first:
+            for pool in self.free.values():
+                heapq.heapify(pool)
 
     def find_available_spot(self, type: str) -> Spot:
-        for spot in self.spots:
-            if spot.status == Status.AVAILABLE and spot.type == type:
-                spot.status = Status.OCCUPIED
-                return spot
-        raise ValueError(f"No available spots for type {type}")
+        with self.lock:
+            pool = self.free.get(type)
+            while pool:
+                spot = heapq.heappop(pool)[2] if self.nearest_first else pool.pop()
+                if spot.status == Status.AVAILABLE:
+                    spot.status = Status.OCCUPIED
+                    self.counts[type] -= 1
+                    return spot
+            raise ValueError(f"No available spots for type {type}")
 
     def release_spot(self, spot: Spot):
+        with self.lock:
+            if spot.status == Status.OCCUPIED:
+                self.make_available(spot)
+
+    def set_status(self, spot: Spot, status: Status):
+        """Move a spot in or out of service, e.g. MAINTENANCE and back to AVAILABLE, keeping the pools in sync."""
+        with self.lock:
+            if spot.status == status:
+                return
+            if spot.status == Status.AVAILABLE:
+                self.counts[spot.type] -= 1  # its pool entry is skipped when popped
+            if status == Status.AVAILABLE:
+                self.make_available(spot)
+            else:
+                spot.status = status
+
+    def make_available(self, spot: Spot):
         spot.status = Status.AVAILABLE
+        self.counts[spot.type] += 1
+        if self.nearest_first:
+            heapq.heappush(self.free[spot.type], (spot.distance, spot.id, spot))
+        else:
+            self.free[spot.type].append(spot)
+
+    def available(self, type: str) -> int:
+        return self.counts.get(type, 0)
 
 class PaymentCalculator:
     def __init__(self, rate: Dict[str, float]):
@@ -53,16 +107,20 @@ class PaymentCalculator:
         return round(self.rate[spot_type] * duration_hours, 2)
 
 class Garage:
-    def __init__(self, id: int, rate: dict, zipcode: str, spots: List[Spot]):
+    def __init__(self, id: int, rate: dict, zipcode: str, spots: List[Spot], nearest_first: bool = False, log=print):
         self.id = id
         self.zipcode = zipcode
-        self.spot_manager = SpotManager(spots)
+        self.spot_manager = SpotManager(spots, nearest_first)
         self.payment_calculator = PaymentCalculator(rate)
+        self.log = log or (lambda message: None)
+        self.network = None
 
     def allot_spot(self, type: str, vehicle_registration: str) -> Reservation:
         spot = self.spot_manager.find_available_spot(type)
-        reservation = Reservation(vehicle_registration, spot, datetime.now(timezone.utc))
-        print(f"Reservation {reservation.id} has been created for {vehicle_registration}. Spot assigned is {spot.id}.")
+        reservation = Reservation(vehicle_registration, spot, datetime.now(timezone.utc), self.id)
+        self.log(f"Reservation {reservation.id} has been created for {vehicle_registration}. Spot assigned is {spot.id}.")
+        if self.network:
+            self.network.availability_changed(self, type)
         return reservation
 
     def checkout(self, reservation: Reservation):
@@ -70,33 +128,179 @@ class Garage:
         charges = self.payment_calculator.calculate_charge(
             reservation.spot.type, reservation.start_time, end_time
         )
-        print(f"Your parking charge is {str(charges)}.")
+        self.log(f"Your parking charge is {str(charges)}.")
         reservation.make_payment(end_time, charges)
         self.spot_manager.release_spot(reservation.spot)
-        print("Thank you. Visit again.")
-
-prices = {
-    "Compact": 36000,
-    "Regular": 72000,
-    "Large": 108000
-}
-
-spots = []
-com_spots, reg_spots, lar_spots = 3, 5, 2
-for i in range(com_spots):
-    spot = Spot("C" + str(i), 'Compact')
-    spots.append(spot)
-for i in range(reg_spots):
-    spot = Spot("R" + str(i), 'Regular')
-    spots.append(spot)
-for i in range(lar_spots):
-    spot = Spot("L" + str(i), 'Large')
-    spots.append(spot)
-garage = Garage(1, prices, "641035", spots)
-reservation_01 = garage.allot_spot("Regular", "TN 37 BOSS")
-reservation_02 = garage.allot_spot("Compact", "TN 66 MASS")
-reservation_03 = garage.allot_spot("Large", "TN 07 THALA")
-sleep(1)
-garage.checkout(reservation_02)
-garage.checkout(reservation_03)
-garage.checkout(reservation_01)
+        if self.network:
+            self.network.availability_changed(self, reservation.spot.type)
+        self.log("Thank you. Visit again.")
+
+    def set_spot_status(self, spot: Spot, status: Status):
+        self.spot_manager.set_status(spot, status)
+        if self.network:
+            self.network.availability_changed(self, spot.type)
+
+class GarageNetwork:
+    """
+    Availability index over many garages. For every (zipcode, spot type) it keeps the garages with free spots of that
+    type, and for every type a sorted list of zipcodes that have any; garages report each allot_spot/checkout, so the
+    index is updated incrementally and never rebuilt. Garages carry no coordinates, so "nearest" means the closest
+    zipcode numerically: find_nearest is a bisect into that sorted list plus a step either side, O(log zipcodes).
+    """
+    def __init__(self):
+        self.garages = {}
+        self.zipcodes = {}  # garage id -> numeric zipcode
+        self.available = defaultdict(dict)  # (zipcode, type) -> {garage id: free spots}
+        self.open_zipcodes = defaultdict(list)  # type -> sorted zipcodes with a free spot of that type
+        self.lock = Lock()
+
+    @staticmethod
+    def zipcode_number(zipcode: str) -> int:
+        if not str(zipcode).strip().isdecimal():
+            raise ValueError(f"Zipcode {zipcode!r} must be numeric; the network finds the nearest garage by zipcode number.")
+        return int(zipcode)
+
+    def add_garage(self, garage: Garage):
+        self.zipcodes[garage.id] = self.zipcode_number(garage.zipcode)
+        self.garages[garage.id] = garage
+        garage.network = self
+        for type in list(garage.spot_manager.free):
+            self.availability_changed(garage, type)
+
+    def availability_changed(self, garage: Garage, type: str):
+        zipcode = self.zipcodes[garage.id]
+        with self.lock:
+            # Read the pool under the index lock so concurrent updates for one garage apply in order
+            free = garage.spot_manager.available(type)
+            garages = self.available[(zipcode, type)]
+            was_open = bool(garages)
+            if free:
+                garages[garage.id] = free
+            else:
+                garages.pop(garage.id, None)
+            if garages and not was_open:
+                insort(self.open_zipcodes[type], zipcode)
+            elif was_open and not garages:
+                zipcodes = self.open_zipcodes[type]
+                del zipcodes[bisect_left(zipcodes, zipcode)]
+
+    def find_nearest(self, zipcode: str, type: str) -> Garage:
+        """Garage with a free spot of this type in the closest zipcode, or None if the network is full."""
+        zipcode = self.zipcode_number(zipcode)
+        with self.lock:
+            zipcodes = self.open_zipcodes[type]
+            if not zipcodes:
+                return None
+            index = bisect_left(zipcodes, zipcode)
+            candidates = zipcodes[max(index - 1, 0):index + 1]
+            nearest = min(candidates, key=lambda candidate: abs(candidate - zipcode))
+            garages = self.available[(nearest, type)]
+            return self.garages[next(iter(garages))]
+
+    def allot_spot(self, zipcode: str, type: str, vehicle_registration: str) -> Reservation:
+        while True:
+            garage = self.find_nearest(zipcode, type)
+            if garage is None:
+                raise ValueError(f"No available spots for type {type}")
+            try:
+                return garage.allot_spot(type, vehicle_registration)
+            except ValueError:
+                # Another gate took the last spot first; correct the index before looking again
+                self.availability_changed(garage, type)
+
+    def checkout(self, reservation: Reservation):
+        self.garages[reservation.garage_id].checkout(reservation)
+
+def benchmark(num_spots: int = 1_000_000, gates: int = 4, types=("Compact", "Regular", "Large")):
+    """Arrival and checkout rates at num_spots spots, for the stack pools and the nearest-first heaps."""
+    for nearest_first in (False, True):
+        rng = random.Random(1)
+        garage_spots = [Spot(f"S{i}", types[i % len(types)], rng.random() * 500) for i in range(num_spots)]
+        manager = SpotManager(garage_spots, nearest_first)
+        start = perf_counter()
+        taken = [manager.find_available_spot(types[i % len(types)]) for i in range(num_spots)]
+        arrival = perf_counter() - start
+        start = perf_counter()
+        for spot in taken:
+            manager.release_spot(spot)
+        checkout = perf_counter() - start
+        mode = "nearest-first heap" if nearest_first else "stack"
+        print(f"[{mode}, {num_spots} spots] arrivals {num_spots / arrival:,.0f}/s, checkouts {num_spots / checkout:,.0f}/s")
+
+    # Concurrent gates drain the Regular pool; every spot must be handed out exactly once
+    manager = SpotManager(garage_spots, nearest_first=False)
+    allotted = [[] for _ in range(gates)]
+    def gate(taken):
+        while True:
+            try:
+                taken.append(manager.find_available_spot("Regular"))
+            except ValueError:
+                return
+    threads = [Thread(target=gate, args=(taken,)) for taken in allotted]
+    start = perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = perf_counter() - start
+    handed_out = [spot.id for taken in allotted for spot in taken]
+    assert len(handed_out) == len(set(handed_out)) == sum(spot.type == "Regular" for spot in garage_spots)
+    print(f"[{gates} gates] {len(handed_out) / elapsed:,.0f} arrivals/s, no spot handed out twice")
+
+def benchmark_network(num_garages: int = 10_000, spots_per_type: int = 10, queries: int = 10_000,
+                      rate={"Compact": 1.0, "Regular": 2.0, "Large": 3.0}):
+    """find_nearest latency across num_garages garages, while empty and once most Regular spots are taken."""
+    rng = random.Random(1)
+    network = GarageNetwork()
+    for garage_id in range(num_garages):
+        garage_spots = [Spot(f"{garage_id}-{type[0]}{i}", type) for type in rate for i in range(spots_per_type)]
+        network.add_garage(Garage(garage_id, rate, str(rng.randrange(600000, 700000)), garage_spots, log=None))
+    zipcodes = [str(rng.randrange(600000, 700000)) for _ in range(queries)]
+
+    def measure(label):
+        start = perf_counter()
+        for zipcode in zipcodes:
+            network.find_nearest(zipcode, "Regular")
+        print(f"[{num_garages} garages, {label}] find nearest Regular spot: {(perf_counter() - start) / queries * 1e6:.1f}us")
+
+    measure("empty")
+    start = perf_counter()
+    reservations = [network.allot_spot(rng.choice(zipcodes), "Regular", f"TN {i}") for i in range(num_garages * spots_per_type * 9 // 10)]
+    elapsed = perf_counter() - start
+    print(f"[{num_garages} garages] {len(reservations) / elapsed:,.0f} network allotments/s")
+    measure("90% full")
+    start = perf_counter()
+    for reservation in reservations:
+        network.checkout(reservation)
+    print(f"[{num_garages} garages] {len(reservations) / (perf_counter() - start):,.0f} network checkouts/s")
+
+if __name__ == "__main__":
+    prices = {
+        "Compact": 36000,
+        "Regular": 72000,
+        "Large": 108000
+    }
+
+    spots = []
+    com_spots, reg_spots, lar_spots = 3, 5, 2
+    for i in range(com_spots):
+        spot = Spot("C" + str(i), 'Compact')
+        spots.append(spot)
+    for i in range(reg_spots):
+        spot = Spot("R" + str(i), 'Regular')
+        spots.append(spot)
+    for i in range(lar_spots):
+        spot = Spot("L" + str(i), 'Large')
+        spots.append(spot)
+    garage = Garage(1, prices, "641035", spots)
+    reservation_01 = garage.allot_spot("Regular", "TN 37 BOSS")
+    reservation_02 = garage.allot_spot("Compact", "TN 66 MASS")
+    reservation_03 = garage.allot_spot("Large", "TN 07 THALA")
+    sleep(1)
+    garage.checkout(reservation_02)
+    garage.checkout(reservation_03)
+    garage.checkout(reservation_01)
+
+    benchmark_network()
+    if "--benchmark" in sys.argv:
+        benchmark()  # 1M spots, takes a while